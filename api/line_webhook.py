@@ -3,24 +3,52 @@ import hashlib
 import hmac
 import json
 import os
-from http.server import BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:  # optional
+    import orjson
+except Exception:  # pragma: no cover - optional dependency at runtime
+    orjson = None
+
+
+def signature_matches(mac, signature: str) -> bool:
+    expected = base64.b64encode(mac.digest())
+    return hmac.compare_digest(expected, signature.encode("utf-8"))
 
 
 def verify_signature(body: bytes, signature: str, channel_secret: str) -> bool:
-    mac = hmac.new(channel_secret.encode("utf-8"), body, hashlib.sha256).digest()
-    expected = base64.b64encode(mac).decode("utf-8")
-    return hmac.compare_digest(expected, signature)
+    mac = hmac.new(channel_secret.encode("utf-8"), body, hashlib.sha256)
+    return signature_matches(mac, signature)
+
+
+_READ_CHUNK_SIZE = 65536
+
+
+def read_body(rfile, content_length: int, mac=None) -> bytearray:
+    body = bytearray()
+    remaining = content_length
+    while remaining > 0:
+        chunk = rfile.read(min(_READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        if mac is not None:
+            mac.update(chunk)
+        body += chunk
+        remaining -= len(chunk)
+    return body
 
 
 class handler(BaseHTTPRequestHandler):
     def do_POST(self) -> None:
         content_length = int(self.headers.get("Content-Length", "0"))
-        body = self.rfile.read(content_length)
         signature = self.headers.get("X-Line-Signature", "")
         channel_secret = os.getenv("LINE_CHANNEL_SECRET", "")
-
+        mac = None
         if channel_secret and signature:
-            if not verify_signature(body, signature, channel_secret):
+            mac = hmac.new(channel_secret.encode("utf-8"), digestmod=hashlib.sha256)
+        body = read_body(self.rfile, content_length, mac)
+        if mac is not None:
+            if not signature_matches(mac, signature):
                 self.send_response(401)
                 self.send_header("Content-Type", "application/json")
                 self.end_headers()
@@ -28,8 +56,10 @@ class handler(BaseHTTPRequestHandler):
                 return
 
         try:
-            payload = json.loads(body.decode("utf-8"))
-        except json.JSONDecodeError:
+            payload = orjson.loads(body) if orjson is not None else json.loads(body.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            payload = {}
+        if not isinstance(payload, dict):
             payload = {}
 
         user_ids = []
@@ -44,8 +74,26 @@ class handler(BaseHTTPRequestHandler):
         else:
             print("LINE webhook received, but no userId found.")
 
-        response_body = json.dumps({"status": "ok", "userIds": user_ids}).encode("utf-8")
+        response = {"status": "ok", "userIds": user_ids}
+        if orjson is not None:
+            response_body = orjson.dumps(response)
+        else:
+            response_body = json.dumps(response).encode("utf-8")
         self.send_response(200)
         self.send_header("Content-Type", "application/json")
         self.end_headers()
         self.wfile.write(response_body)
+
+
+def serve(port: int) -> None:
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    print(f"LINE webhook listening on port {port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve(int(os.getenv("WEBHOOK_PORT", "8000") or 8000))
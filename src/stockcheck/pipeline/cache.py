@@ -0,0 +1,146 @@
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from .utils import dumps_json, loads_json
+
+_LOGGER = logging.getLogger(__name__)
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def get_cache_dir() -> str:
+    path = os.getenv("CACHE_DIR", "")
+    if path:
+        return path
+    root = Path(__file__).resolve().parents[3]
+    return str(root / "data" / "cache")
+
+
+def _safe_name(value: str) -> str:
+    return _UNSAFE_CHARS.sub("_", value) or "_"
+
+
+class FileCache:
+    def __init__(
+        self,
+        root: str,
+        ttl_sec: float,
+        enabled: bool = True,
+        memory_size: int = 256,
+        memory_max_bytes: int = 262144,
+    ) -> None:
+        self.root = root
+        self.ttl_sec = ttl_sec
+        self.enabled = enabled
+        self.memory_size = memory_size
+        self.memory_max_bytes = memory_max_bytes
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, namespace: str, key: str, created_at: float, payload: Any, size: int) -> None:
+        if self.memory_size <= 0 or size > self.memory_max_bytes:
+            return
+        with self._lock:
+            self._memory[(namespace, key)] = (created_at, payload)
+            self._memory.move_to_end((namespace, key))
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _path(self, namespace: str, key: str) -> str:
+        return os.path.join(self.root, _safe_name(namespace), f"{_safe_name(key)}.json")
+
+    def get(self, namespace: str, key: str, ttl_sec: Optional[float] = None) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        ttl_sec = self.ttl_sec if ttl_sec is None else ttl_sec
+        with self._lock:
+            entry = self._memory.get((namespace, key))
+            if entry is not None:
+                self._memory.move_to_end((namespace, key))
+        if entry is None:
+            path = self._path(namespace, key)
+            try:
+                with open(path, "rb") as handle:
+                    raw = handle.read()
+                stored = loads_json(raw)
+            except (OSError, ValueError):
+                return None
+            entry = (float(stored.get("created_at", 0)), stored.get("payload"))
+            self._remember(namespace, key, *entry, len(raw))
+        created_at, payload = entry
+        if ttl_sec >= 0 and time.time() - created_at > ttl_sec:
+            return None
+        return payload
+
+    def set(self, namespace: str, key: str, payload: Any) -> None:
+        if not self.enabled:
+            return
+        path = self._path(namespace, key)
+        tmp_path = None
+        created_at = time.time()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            text = dumps_json({"created_at": created_at, "payload": payload})
+            with open(fd, "w", encoding="utf-8") as handle:
+                handle.write(text)
+            os.replace(tmp_path, path)
+            self._remember(namespace, key, created_at, payload, len(text))
+        except (OSError, TypeError, ValueError) as exc:
+            _LOGGER.warning("Cache write failed %s/%s: %s", namespace, key, exc)
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def prune(self, max_age_sec: float) -> int:
+        if not self.enabled or max_age_sec <= 0:
+            return 0
+        cutoff = time.time() - max_age_sec
+        removed = 0
+        try:
+            namespaces = [entry for entry in os.scandir(self.root) if entry.is_dir()]
+        except OSError:
+            return 0
+        for namespace in namespaces:
+            try:
+                entries = list(os.scandir(namespace.path))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+
+_CACHE: Optional[FileCache] = None
+
+
+def get_cache() -> FileCache:
+    global _CACHE
+    if _CACHE is None:
+        enabled = os.getenv("CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+        ttl_sec = float(os.getenv("CACHE_TTL_SEC", "21600") or 21600)
+        memory_size = int(os.getenv("CACHE_MEMORY_SIZE", "256") or 256)
+        memory_max_bytes = int(os.getenv("CACHE_MEMORY_MAX_BYTES", "262144") or 262144)
+        max_age_sec = float(os.getenv("CACHE_MAX_AGE_SEC", "172800") or 172800)
+        _CACHE = FileCache(
+            get_cache_dir(),
+            ttl_sec=ttl_sec,
+            enabled=enabled,
+            memory_size=memory_size,
+            memory_max_bytes=memory_max_bytes,
+        )
+        _CACHE.prune(max_age_sec)
+    return _CACHE
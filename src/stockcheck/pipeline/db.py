@@ -1,28 +1,45 @@
-import json
+import functools
 import os
 import sqlite3
-from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Tuple
 
 from .models import PriceRow
+from .utils import dumps_json
 
 
-def get_pipeline_db_path() -> str:
-    path = os.getenv("PIPELINE_DB_PATH", "")
-    if path:
-        return path
+_CREATED_AT_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+
+@functools.lru_cache(maxsize=1)
+def _default_db_path() -> str:
     root = Path(__file__).resolve().parents[3]
     return str(root / "data" / "market_data.db")
 
 
-def connect(db_path: str) -> sqlite3.Connection:
+def get_pipeline_db_path() -> str:
+    return os.getenv("PIPELINE_DB_PATH", "") or _default_db_path()
+
+
+@functools.lru_cache(maxsize=1)
+def get_connect_settings() -> Tuple[float, bool]:
     timeout_sec = float(os.getenv("SQLITE_BUSY_TIMEOUT_SEC", "30") or 30)
-    conn = sqlite3.connect(db_path, timeout=timeout_sec)
+    fast = os.getenv("PIPELINE_SQLITE_FAST", "true").lower() in {"1", "true", "yes"}
+    return timeout_sec, fast
+
+
+def connect(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    timeout_sec, fast = get_connect_settings()
+    conn = sqlite3.connect(db_path, timeout=timeout_sec, check_same_thread=check_same_thread)
     busy_timeout_ms = int(timeout_sec * 1000)
     try:
         conn.execute("PRAGMA journal_mode=WAL")
         conn.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+        if fast:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.execute("PRAGMA mmap_size=268435456")
     except sqlite3.OperationalError:
         pass
     return conn
@@ -148,93 +165,105 @@ def init_pipeline_db(conn: sqlite3.Connection) -> None:
         )
         """
     )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_news_by_date ON news_items (market, symbol, published_at DESC)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sentiment_by_date ON sentiment_items (market, symbol, published_at DESC)"
+    )
     conn.commit()
 
 
-def save_prices(conn: sqlite3.Connection, market: str, symbol: str, rows: List[PriceRow]) -> None:
-    created_at = datetime.utcnow().isoformat() + "Z"
-    for row in rows:
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO price_daily
-            (market, symbol, date, open, high, low, close, volume, source, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                market,
-                symbol,
-                row.date,
-                row.open,
-                row.high,
-                row.low,
-                row.close,
-                row.volume,
-                row.source,
-                created_at,
-            ),
+def save_prices(conn: sqlite3.Connection, market: str, symbol: str, rows: Iterable[PriceRow]) -> None:
+    params = (
+        (
+            market,
+            symbol,
+            row.date,
+            row.open,
+            row.high,
+            row.low,
+            row.close,
+            row.volume,
+            row.source,
         )
-    conn.commit()
+        for row in rows
+    )
+    conn.executemany(
+        f"""
+        INSERT INTO price_daily
+        (market, symbol, date, open, high, low, close, volume, source, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {_CREATED_AT_SQL})
+        ON CONFLICT (market, symbol, date) DO UPDATE SET
+            open = excluded.open,
+            high = excluded.high,
+            low = excluded.low,
+            close = excluded.close,
+            volume = excluded.volume,
+            source = excluded.source,
+            created_at = excluded.created_at
+        """,
+        params,
+    )
 
 
 def save_indicators(
     conn: sqlite3.Connection,
     market: str,
     symbol: str,
-    indicators: List[Dict[str, Optional[float]]],
+    indicators: Iterable[Tuple[Any, ...]],
 ) -> None:
-    created_at = datetime.utcnow().isoformat() + "Z"
-    for item in indicators:
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO indicators_daily
-            (market, symbol, date, sma20, sma50, ema12, ema26, rsi14,
-             macd, macd_signal, macd_hist, bb_mid, bb_upper, bb_lower, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                market,
-                symbol,
-                item["date"],
-                item["sma20"],
-                item["sma50"],
-                item["ema12"],
-                item["ema26"],
-                item["rsi14"],
-                item["macd"],
-                item["macd_signal"],
-                item["macd_hist"],
-                item["bb_mid"],
-                item["bb_upper"],
-                item["bb_lower"],
-                created_at,
-            ),
-        )
-    conn.commit()
+    params = ((market, symbol, *item) for item in indicators)
+    conn.executemany(
+        f"""
+        INSERT INTO indicators_daily
+        (market, symbol, date, sma20, sma50, ema12, ema26, rsi14,
+         macd, macd_signal, macd_hist, bb_mid, bb_upper, bb_lower, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {_CREATED_AT_SQL})
+        ON CONFLICT (market, symbol, date) DO UPDATE SET
+            sma20 = excluded.sma20,
+            sma50 = excluded.sma50,
+            ema12 = excluded.ema12,
+            ema26 = excluded.ema26,
+            rsi14 = excluded.rsi14,
+            macd = excluded.macd,
+            macd_signal = excluded.macd_signal,
+            macd_hist = excluded.macd_hist,
+            bb_mid = excluded.bb_mid,
+            bb_upper = excluded.bb_upper,
+            bb_lower = excluded.bb_lower,
+            created_at = excluded.created_at
+        """,
+        params,
+    )
 
 
 def save_news(conn: sqlite3.Connection, market: str, symbol: str, items: List[Dict[str, str]]) -> None:
-    created_at = datetime.utcnow().isoformat() + "Z"
-    for item in items:
-        url = item.get("url") or ""
-        if not url:
-            continue
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO news_items
-            (market, symbol, published_at, title, url, source, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                market,
-                symbol,
-                item.get("published_at"),
-                item.get("title", ""),
-                url,
-                item.get("source", "google_news"),
-                created_at,
-            ),
+    unique_items = {item["url"]: item for item in items if item.get("url")}
+    params = [
+        (
+            market,
+            symbol,
+            item.get("published_at"),
+            item.get("title", ""),
+            item["url"],
+            item.get("source", "google_news"),
         )
-    conn.commit()
+        for item in unique_items.values()
+    ]
+    conn.executemany(
+        f"""
+        INSERT INTO news_items
+        (market, symbol, published_at, title, url, source, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, {_CREATED_AT_SQL})
+        ON CONFLICT (market, symbol, url) DO UPDATE SET
+            published_at = excluded.published_at,
+            title = excluded.title,
+            source = excluded.source,
+            created_at = excluded.created_at
+        """,
+        params,
+    )
 
 
 def save_financials(
@@ -248,47 +277,52 @@ def save_financials(
 ) -> None:
     if not payload:
         return
-    created_at = datetime.utcnow().isoformat() + "Z"
     conn.execute(
-        """
-        INSERT OR REPLACE INTO financials
+        f"""
+        INSERT INTO financials
         (market, symbol, period_end, report_type, payload_json, source, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, {_CREATED_AT_SQL})
+        ON CONFLICT (market, symbol, report_type, period_end) DO UPDATE SET
+            payload_json = excluded.payload_json,
+            source = excluded.source,
+            created_at = excluded.created_at
         """,
         (
             market,
             symbol,
             period_end or "",
             report_type,
-            json.dumps(payload),
+            dumps_json(payload),
             source,
-            created_at,
         ),
     )
-    conn.commit()
 
 
 def save_sentiment(conn: sqlite3.Connection, market: str, symbol: str, items: List[Dict[str, str]]) -> None:
-    created_at = datetime.utcnow().isoformat() + "Z"
-    for item in items:
-        url = item.get("url") or ""
-        if not url:
-            continue
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO sentiment_items
-            (market, symbol, published_at, title, url, source, score, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                market,
-                symbol,
-                item.get("published_at"),
-                item.get("title", ""),
-                url,
-                item.get("source", "reddit"),
-                float(item.get("score") or 0.0),
-                created_at,
-            ),
+    unique_items = {item["url"]: item for item in items if item.get("url")}
+    params = [
+        (
+            market,
+            symbol,
+            item.get("published_at"),
+            item.get("title", ""),
+            item["url"],
+            item.get("source", "reddit"),
+            float(item.get("score") or 0.0),
         )
-    conn.commit()
+        for item in unique_items.values()
+    ]
+    conn.executemany(
+        f"""
+        INSERT INTO sentiment_items
+        (market, symbol, published_at, title, url, source, score, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, {_CREATED_AT_SQL})
+        ON CONFLICT (market, symbol, url) DO UPDATE SET
+            published_at = excluded.published_at,
+            title = excluded.title,
+            source = excluded.source,
+            score = excluded.score,
+            created_at = excluded.created_at
+        """,
+        params,
+    )
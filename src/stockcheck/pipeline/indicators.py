@@ -1,92 +1,107 @@
-from typing import Dict, List, Optional
+from typing import Any, List, Optional, Tuple
 
-import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 from .models import PriceRow
 
 
-def _sma(series: pd.Series, length: int) -> pd.Series:
-    return series.rolling(window=length, min_periods=length).mean()
-
-
-def _ema(series: pd.Series, length: int) -> pd.Series:
-    return series.ewm(span=length, adjust=False, min_periods=length).mean()
-
-
-def _rsi(series: pd.Series, length: int) -> pd.Series:
-    delta = series.diff()
-    gain = delta.clip(lower=0.0)
-    loss = (-delta).clip(lower=0.0)
-    avg_gain = gain.ewm(alpha=1 / length, adjust=False, min_periods=length).mean()
-    avg_loss = loss.ewm(alpha=1 / length, adjust=False, min_periods=length).mean()
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
-
-
-def _macd(series: pd.Series, fast: int, slow: int, signal: int) -> pd.DataFrame:
-    macd_line = _ema(series, fast) - _ema(series, slow)
-    signal_line = macd_line.ewm(span=signal, adjust=False, min_periods=signal).mean()
+def _nan_array(size: int) -> np.ndarray:
+    return np.full(size, np.nan, dtype=np.float64)
+
+
+def _sma(values: np.ndarray, length: int) -> np.ndarray:
+    out = _nan_array(values.size)
+    if values.size >= length:
+        out[length - 1 :] = sliding_window_view(values, length).mean(axis=1)
+    return out
+
+
+def _ewm(values: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    out = _nan_array(values.size)
+    valid = np.flatnonzero(~np.isnan(values))
+    if not valid.size:
+        return out
+    start = int(valid[0])
+    decay = 1.0 - alpha
+    current = float(values[start])
+    out[start] = current
+    for idx in range(start + 1, values.size):
+        current = decay * current + alpha * float(values[idx])
+        out[idx] = current
+    out[: start + min_periods - 1] = np.nan
+    return out
+
+
+def _ema(values: np.ndarray, length: int) -> np.ndarray:
+    return _ewm(values, 2.0 / (length + 1), length)
+
+
+def _rsi(values: np.ndarray, length: int) -> np.ndarray:
+    delta = np.empty_like(values)
+    delta[0] = np.nan
+    delta[1:] = np.diff(values)
+    gain = np.where(np.isnan(delta), np.nan, np.clip(delta, 0.0, None))
+    loss = np.where(np.isnan(delta), np.nan, np.clip(-delta, 0.0, None))
+    avg_gain = _ewm(gain, 1.0 / length, length)
+    avg_loss = _ewm(loss, 1.0 / length, length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def _macd(
+    values: np.ndarray,
+    fast: int,
+    slow: int,
+    signal: int,
+    fast_ema: Optional[np.ndarray] = None,
+    slow_ema: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if fast_ema is None:
+        fast_ema = _ema(values, fast)
+    if slow_ema is None:
+        slow_ema = _ema(values, slow)
+    macd_line = fast_ema - slow_ema
+    signal_line = _ema(macd_line, signal)
     hist = macd_line - signal_line
-    return pd.DataFrame({"macd": macd_line, "signal": signal_line, "hist": hist})
-
-
-def _bbands(series: pd.Series, length: int, std: float) -> pd.DataFrame:
-    mid = series.rolling(window=length, min_periods=length).mean()
-    deviation = series.rolling(window=length, min_periods=length).std()
+    return macd_line, signal_line, hist
+
+
+def _bbands(
+    values: np.ndarray,
+    length: int,
+    std: float,
+    mid: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if mid is None:
+        mid = _sma(values, length)
+    deviation = _nan_array(values.size)
+    if values.size >= length:
+        deviation[length - 1 :] = sliding_window_view(values, length).std(axis=1, ddof=1)
     upper = mid + std * deviation
     lower = mid - std * deviation
-    return pd.DataFrame({"mid": mid, "upper": upper, "lower": lower})
+    return mid, upper, lower
+
 
+def _nullable(values: np.ndarray) -> List[Optional[float]]:
+    return [None if value != value else value for value in values.tolist()]
 
-def compute_indicators(rows: List[PriceRow]) -> List[Dict[str, Optional[float]]]:
+
+def compute_indicators_tuples(rows: List[PriceRow]) -> List[Tuple[Any, ...]]:
     if not rows:
         return []
 
-    df = pd.DataFrame(
-        [
-            {
-                "date": row.date,
-                "open": row.open,
-                "high": row.high,
-                "low": row.low,
-                "close": row.close,
-                "volume": row.volume,
-            }
-            for row in rows
-        ]
-    )
-
-    sma20 = _sma(df["close"], 20)
-    sma50 = _sma(df["close"], 50)
-    ema12 = _ema(df["close"], 12)
-    ema26 = _ema(df["close"], 26)
-    rsi14 = _rsi(df["close"], 14)
-    macd = _macd(df["close"], fast=12, slow=26, signal=9)
-    bbands = _bbands(df["close"], length=20, std=2.0)
-
-    def as_optional(value):
-        if pd.isna(value):
-            return None
-        return float(value)
-
-    indicators = []
-    for idx, row in df.iterrows():
-        macd_row = macd.iloc[idx]
-        bb_row = bbands.iloc[idx]
-        indicators.append(
-            {
-                "date": str(row["date"]),
-                "sma20": as_optional(sma20.iloc[idx]),
-                "sma50": as_optional(sma50.iloc[idx]),
-                "ema12": as_optional(ema12.iloc[idx]),
-                "ema26": as_optional(ema26.iloc[idx]),
-                "rsi14": as_optional(rsi14.iloc[idx]),
-                "macd": as_optional(macd_row["macd"]),
-                "macd_signal": as_optional(macd_row["signal"]),
-                "macd_hist": as_optional(macd_row["hist"]),
-                "bb_mid": as_optional(bb_row["mid"]),
-                "bb_upper": as_optional(bb_row["upper"]),
-                "bb_lower": as_optional(bb_row["lower"]),
-            }
-        )
-    return indicators
+    close = np.fromiter((row.close for row in rows), dtype=np.float64, count=len(rows))
+
+    sma20 = _sma(close, 20)
+    sma50 = _sma(close, 50)
+    ema12 = _ema(close, 12)
+    ema26 = _ema(close, 26)
+    rsi14 = _rsi(close, 14)
+    macd, macd_signal, macd_hist = _macd(close, fast=12, slow=26, signal=9, fast_ema=ema12, slow_ema=ema26)
+    bb_mid, bb_upper, bb_lower = _bbands(close, length=20, std=2.0, mid=sma20)
+
+    columns = (sma20, sma50, ema12, ema26, rsi14, macd, macd_signal, macd_hist, bb_mid, bb_upper, bb_lower)
+    dates = [str(row.date) for row in rows]
+    return list(zip(dates, *map(_nullable, columns)))
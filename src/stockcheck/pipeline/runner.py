@@ -1,13 +1,13 @@
 import json
 import os
+import sqlite3
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
-
-from dotenv import load_dotenv
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from . import db, indicators, sources
-from .utils import load_json, safe_call
+from .utils import load_env, load_json, safe_call, utc_now_iso
 
 
 def _get_worker_count(target: int) -> int:
@@ -15,6 +15,49 @@ def _get_worker_count(target: int) -> int:
     return max(1, min(env_value, target))
 
 
+_PERIOD_END_KEYS = ("date", "end_date", "period_end", "report_date")
+
+
+def _iter_period_ends(payload: Any) -> Iterator[str]:
+    if not isinstance(payload, dict):
+        return
+    data_items = payload.get("data")
+    if isinstance(data_items, list):
+        for item in data_items:
+            if not isinstance(item, dict):
+                continue
+            for key in _PERIOD_END_KEYS:
+                value = item.get(key)
+                if value:
+                    yield str(value)
+    facts = payload.get("facts")
+    if isinstance(facts, dict):
+        for namespace in facts.values():
+            if not isinstance(namespace, dict):
+                continue
+            for metric in namespace.values():
+                try:
+                    units = metric.get("units", {})
+                except AttributeError:
+                    continue
+                if not isinstance(units, dict):
+                    continue
+                for entries in units.values():
+                    if not isinstance(entries, list):
+                        continue
+                    for entry in entries:
+                        try:
+                            end_value = entry.get("end")
+                        except AttributeError:
+                            continue
+                        if end_value:
+                            yield str(end_value)
+
+
+def _extract_period_end(payload: Any) -> str:
+    return max(_iter_period_ends(payload), default="")
+
+
 def run_pipeline(
     market: str,
     subscription_path: str,
@@ -23,14 +66,14 @@ def run_pipeline(
     verbose: bool = False,
     summary_json: bool = False,
 ) -> None:
-    load_dotenv()
+    load_env()
     subscriptions = load_json(subscription_path)
     metadata = load_json(metadata_path)
     watchlist = subscriptions.get(market, [])
     if not watchlist:
         raise ValueError(f"No subscriptions for market '{market}'")
 
-    end_date = datetime.utcnow().date()
+    end_date = datetime.now(timezone.utc).date()
     start_date = end_date - timedelta(days=days)
     finmind_token = os.getenv("FINMIND_API_KEY", "")
     totals = {"prices": 0, "indicators": 0, "news": 0, "sentiment": 0, "financials": 0, "symbols": 0}
@@ -48,7 +91,7 @@ def run_pipeline(
             return
         if not verbose and not force:
             return
-        timestamp = datetime.utcnow().isoformat() + "Z"
+        timestamp = utc_now_iso()
         print(f"{timestamp} [{level}] {message}")
 
     db_path = db.get_pipeline_db_path()
@@ -59,6 +102,19 @@ def run_pipeline(
     finally:
         init_conn.close()
 
+    local = threading.local()
+    connections: List[sqlite3.Connection] = []
+    connections_lock = threading.Lock()
+
+    def get_conn() -> sqlite3.Connection:
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = db.connect(db_path, check_same_thread=False)
+            local.conn = conn
+            with connections_lock:
+                connections.append(conn)
+        return conn
+
     def process_symbol(symbol: str) -> Optional[Dict[str, Any]]:
         log("INFO", f"Pipeline start: market={market} symbol={symbol}", force=True)
         symbol_totals = {
@@ -72,6 +128,75 @@ def run_pipeline(
             "news_by_source": {},
             "sentiment_by_source": {},
         }
+        query = sources.get_symbol_query(symbol, metadata, market)
+
+        def fetch_news() -> List[Dict[str, str]]:
+            items = safe_call(
+                f"News fetch google {symbol}",
+                lambda: sources.fetch_google_news(query, market),
+                [],
+                log,
+            )
+            for item in items:
+                item["source"] = "google_news"
+            return items
+
+        def fetch_financials() -> Optional[Tuple[str, str, Dict[str, Any], str]]:
+            if market == "us":
+                cik = sources.get_symbol_cik(symbol, metadata)
+                if not cik:
+                    return None
+                payload = safe_call(
+                    f"Financials fetch sec {symbol}",
+                    lambda: sources.fetch_sec_companyfacts(cik),
+                    {},
+                    log,
+                )
+                return (_extract_period_end(payload), "companyfacts", payload, "sec_edgar")
+            if not finmind_token:
+                return None
+            payload = safe_call(
+                f"Financials fetch finmind {symbol}",
+                lambda: sources.fetch_finmind_financials(symbol, start_date, end_date, finmind_token),
+                {},
+                log,
+            )
+            return (_extract_period_end(payload), "financial_statements", payload, "finmind")
+
+        def fetch_sentiment() -> List[Dict[str, str]]:
+            if market != "us":
+                items = safe_call(
+                    f"Sentiment fetch ptt {symbol}",
+                    lambda: sources.fetch_ptt_search(sources.strip_tw_symbol(symbol)),
+                    [],
+                    log,
+                )
+                for item in items:
+                    item["source"] = "ptt"
+                return items
+            items = safe_call(
+                f"Sentiment fetch reddit {symbol}",
+                lambda: sources.fetch_reddit_search(query),
+                [],
+                log,
+            )
+            for item in items:
+                item["source"] = "reddit"
+            if not items:
+                items = safe_call(
+                    f"Sentiment fetch stocktwits {symbol}",
+                    lambda: sources.fetch_stocktwits(symbol),
+                    [],
+                    log,
+                )
+                for item in items:
+                    item["source"] = "stocktwits"
+            return items
+
+        news_future = source_executor.submit(fetch_news)
+        financials_future = source_executor.submit(fetch_financials)
+        sentiment_future = source_executor.submit(fetch_sentiment)
+
         if market == "us":
             price_rows = safe_call(
                 f"Price fetch stooq {symbol}",
@@ -107,187 +232,87 @@ def run_pipeline(
                 log("INFO", f"yfinance prices: {len(price_rows)}")
         if not price_rows:
             log("WARN", f"No prices for {symbol}", force=True)
+            for future in (news_future, financials_future, sentiment_future):
+                future.cancel()
             return None
 
-        conn = db.connect(db_path)
-        try:
-            db.save_prices(conn, market, symbol, price_rows)
-            indicator_rows = indicators.compute_indicators(price_rows)
-            db.save_indicators(conn, market, symbol, indicator_rows)
+        indicator_rows = indicators.compute_indicators_tuples(price_rows)
 
-            symbol_totals["prices"] += len(price_rows)
-            symbol_totals["indicators"] += len(indicator_rows)
-            log("INFO", f"indicators: {len(indicator_rows)}")
-            for row in price_rows:
-                source = row.source or "unknown"
-                symbol_totals["prices_by_source"][source] = symbol_totals["prices_by_source"].get(source, 0) + 1
+        symbol_totals["prices"] += len(price_rows)
+        symbol_totals["indicators"] += len(indicator_rows)
+        log("INFO", f"indicators: {len(indicator_rows)}")
+        for row in price_rows:
+            source = row.source or "unknown"
+            symbol_totals["prices_by_source"][source] = symbol_totals["prices_by_source"].get(source, 0) + 1
 
-            query = sources.get_symbol_query(symbol, metadata, market)
-            news_items = safe_call(
-                f"News fetch google {symbol}",
-                lambda: sources.fetch_google_news(query, market),
-                [],
-                log,
+        news_items = news_future.result()
+        symbol_totals["news"] += len(news_items[:10])
+        log("INFO", f"news items: {len(news_items[:10])}")
+        for item in news_items[:10]:
+            source = item.get("source") or "unknown"
+            symbol_totals["news_by_source"][source] = symbol_totals["news_by_source"].get(source, 0) + 1
+
+        financials = financials_future.result()
+        if financials and financials[2]:
+            symbol_totals["financials"] += 1
+
+        sentiment_items = sentiment_future.result()
+        symbol_totals["sentiment"] += len(sentiment_items[:10])
+        log("INFO", f"sentiment items: {len(sentiment_items[:10])}")
+        for item in sentiment_items[:10]:
+            source = item.get("source") or "unknown"
+            symbol_totals["sentiment_by_source"][source] = (
+                symbol_totals["sentiment_by_source"].get(source, 0) + 1
             )
-            for item in news_items:
-                item["source"] = "google_news"
+
+        conn = get_conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            db.save_prices(conn, market, symbol, price_rows)
+            db.save_indicators(conn, market, symbol, indicator_rows)
             db.save_news(conn, market, symbol, news_items[:10])
-            symbol_totals["news"] += len(news_items[:10])
-            log("INFO", f"news items: {len(news_items[:10])}")
-            for item in news_items[:10]:
-                source = item.get("source") or "unknown"
-                symbol_totals["news_by_source"][source] = symbol_totals["news_by_source"].get(source, 0) + 1
-
-            def extract_period_end(payload: Any) -> str:
-                if not isinstance(payload, dict):
-                    return ""
-                dates: List[str] = []
-                data_items = payload.get("data")
-                if isinstance(data_items, list):
-                    for item in data_items:
-                        if not isinstance(item, dict):
-                            continue
-                        for key in ("date", "end_date", "period_end", "report_date"):
-                            value = item.get(key)
-                            if value:
-                                dates.append(str(value))
-                facts = payload.get("facts")
-                if isinstance(facts, dict):
-                    for namespace in facts.values():
-                        if not isinstance(namespace, dict):
-                            continue
-                        for metric in namespace.values():
-                            units = metric.get("units", {})
-                            if not isinstance(units, dict):
-                                continue
-                            for entries in units.values():
-                                if not isinstance(entries, list):
-                                    continue
-                                for entry in entries:
-                                    if not isinstance(entry, dict):
-                                        continue
-                                    end_value = entry.get("end")
-                                    if end_value:
-                                        dates.append(str(end_value))
-                return max(dates) if dates else ""
+            if financials:
+                db.save_financials(conn, market, symbol, *financials)
+            db.save_sentiment(conn, market, symbol, sentiment_items[:10])
 
-            if market == "us":
-                cik = sources.get_symbol_cik(symbol, metadata)
-                if cik:
-                    payload = safe_call(
-                        f"Financials fetch sec {symbol}",
-                        lambda: sources.fetch_sec_companyfacts(cik),
-                        {},
-                        log,
-                    )
-                    period_end = extract_period_end(payload)
-                    db.save_financials(
-                        conn,
-                        market,
-                        symbol,
-                        period_end,
-                        "companyfacts",
-                        payload,
-                        "sec_edgar",
-                    )
-                    if payload:
-                        symbol_totals["financials"] += 1
-                sentiment_items = safe_call(
-                    f"Sentiment fetch reddit {symbol}",
-                    lambda: sources.fetch_reddit_search(query),
-                    [],
-                    log,
-                )
-                for item in sentiment_items:
-                    item["source"] = "reddit"
-                if not sentiment_items:
-                    sentiment_items = safe_call(
-                        f"Sentiment fetch stocktwits {symbol}",
-                        lambda: sources.fetch_stocktwits(symbol),
-                        [],
-                        log,
-                    )
-                    for item in sentiment_items:
-                        item["source"] = "stocktwits"
-                db.save_sentiment(conn, market, symbol, sentiment_items[:10])
-                symbol_totals["sentiment"] += len(sentiment_items[:10])
-                log("INFO", f"sentiment items: {len(sentiment_items[:10])}")
-                for item in sentiment_items[:10]:
-                    source = item.get("source") or "unknown"
-                    symbol_totals["sentiment_by_source"][source] = (
-                        symbol_totals["sentiment_by_source"].get(source, 0) + 1
-                    )
-            else:
-                if finmind_token:
-                    payload = safe_call(
-                        f"Financials fetch finmind {symbol}",
-                        lambda: sources.fetch_finmind_financials(symbol, start_date, end_date, finmind_token),
-                        {},
-                        log,
-                    )
-                    period_end = extract_period_end(payload)
-                    db.save_financials(
-                        conn,
-                        market,
-                        symbol,
-                        period_end,
-                        "financial_statements",
-                        payload,
-                        "finmind",
-                    )
-                    if payload:
-                        symbol_totals["financials"] += 1
-                sentiment_items = safe_call(
-                    f"Sentiment fetch ptt {symbol}",
-                    lambda: sources.fetch_ptt_search(sources.strip_tw_symbol(symbol)),
-                    [],
-                    log,
-                )
-                for item in sentiment_items:
-                    item["source"] = "ptt"
-                db.save_sentiment(conn, market, symbol, sentiment_items[:10])
-                symbol_totals["sentiment"] += len(sentiment_items[:10])
-                log("INFO", f"sentiment items: {len(sentiment_items[:10])}")
-                for item in sentiment_items[:10]:
-                    source = item.get("source") or "unknown"
-                    symbol_totals["sentiment_by_source"][source] = (
-                        symbol_totals["sentiment_by_source"].get(source, 0) + 1
-                    )
-
-            if not summary_json:
-                log(
-                    "INFO",
-                    "Symbol summary:"
-                    f" symbol={symbol_totals['symbol']}"
-                    f" prices={symbol_totals['prices']}"
-                    f" indicators={symbol_totals['indicators']}"
-                    f" news={symbol_totals['news']}"
-                    f" sentiment={symbol_totals['sentiment']}"
-                    f" financials={symbol_totals['financials']}"
-                    f" {format_sources('prices_by_source', symbol_totals['prices_by_source'])}"
-                    f" {format_sources('news_by_source', symbol_totals['news_by_source'])}"
-                    f" {format_sources('sentiment_by_source', symbol_totals['sentiment_by_source'])}",
-                    force=True,
-                )
-            return symbol_totals
-        finally:
-            conn.close()
+        if not summary_json:
+            log(
+                "INFO",
+                "Symbol summary:"
+                f" symbol={symbol_totals['symbol']}"
+                f" prices={symbol_totals['prices']}"
+                f" indicators={symbol_totals['indicators']}"
+                f" news={symbol_totals['news']}"
+                f" sentiment={symbol_totals['sentiment']}"
+                f" financials={symbol_totals['financials']}"
+                f" {format_sources('prices_by_source', symbol_totals['prices_by_source'])}"
+                f" {format_sources('news_by_source', symbol_totals['news_by_source'])}"
+                f" {format_sources('sentiment_by_source', symbol_totals['sentiment_by_source'])}",
+                force=True,
+            )
+        return symbol_totals
 
     totals["symbols"] = len(watchlist)
     results: List[Dict[str, Any]] = []
     worker_count = _get_worker_count(len(watchlist))
-    if worker_count == 1:
-        for symbol in watchlist:
-            result = process_symbol(symbol)
-            if result:
-                results.append(result)
-    else:
-        with ThreadPoolExecutor(max_workers=worker_count) as executor:
-            futures = {executor.submit(process_symbol, symbol): symbol for symbol in watchlist}
-            for future in as_completed(futures):
-                result = future.result()
+    source_executor = ThreadPoolExecutor(max_workers=worker_count * 3)
+    try:
+        if worker_count == 1:
+            for symbol in watchlist:
+                result = process_symbol(symbol)
                 if result:
                     results.append(result)
+        else:
+            with ThreadPoolExecutor(max_workers=worker_count) as executor:
+                futures = {executor.submit(process_symbol, symbol): symbol for symbol in watchlist}
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result:
+                        results.append(result)
+    finally:
+        source_executor.shutdown(wait=True)
+        for conn in connections:
+            conn.close()
 
     for symbol_totals in results:
         per_symbol.append(symbol_totals)
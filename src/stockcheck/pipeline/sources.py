@@ -1,46 +1,106 @@
-import csv
+import functools
+import hashlib
 import html
+import importlib.util
+import io
+import os
+import re
+from dataclasses import asdict
 from datetime import date, datetime, timedelta
 from email.utils import parsedate_to_datetime
-from typing import Any, Dict, List, Optional
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
 from bs4 import BeautifulSoup
 
+from .cache import get_cache
 from .models import PriceRow
-from .utils import get_http_headers, request_with_retry, strip_tw_symbol
+from .utils import get_http_headers, loads_json, request_with_retry, strip_tw_symbol
 
 try:  # optional
     import yfinance as yf
 except Exception:  # pragma: no cover - optional dependency at runtime
     yf = None
 
+_HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+
+
+def _news_ttl_sec() -> Optional[float]:
+    return float(os.getenv("NEWS_CACHE_TTL_SEC", "1800") or 1800)
+
+
+def _encode_rows(rows: List[PriceRow]) -> List[Dict[str, Any]]:
+    return [asdict(row) for row in rows]
+
+
+def _decode_rows(payload: List[Dict[str, Any]]) -> List[PriceRow]:
+    return [PriceRow(**row) for row in payload]
+
+
+def _copy_items(payload: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [dict(item) for item in payload]
+
+
+def _cached_fetch(
+    name: str,
+    ttl_sec: Callable[[], Optional[float]] = lambda: None,
+    encode: Callable[[Any], Any] = lambda value: value,
+    decode: Callable[[Any], Any] = lambda value: value,
+    keep: Callable[[Any], bool] = bool,
+):
+    namespace = f"pipeline_{name}"
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            digest = hashlib.md5(repr((args, sorted(kwargs.items()))).encode("utf-8")).hexdigest()
+            key = f"{date.today().isoformat()}_{digest}"
+            cached = cache.get(namespace, key, ttl_sec=ttl_sec())
+            if cached is not None:
+                return decode(cached)
+            result = func(*args, **kwargs)
+            if keep(result):
+                cache.set(namespace, key, encode(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
 
 def stooq_symbol(symbol: str) -> str:
     symbol = symbol.lower().strip()
     return f"{symbol}.us"
 
 
+_STOOQ_PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+
+@_cached_fetch("stooq", encode=_encode_rows, decode=_decode_rows)
 def fetch_stooq_daily(symbol: str) -> List[PriceRow]:
     url = f"https://stooq.com/q/d/l/?s={stooq_symbol(symbol)}&i=d"
     response = request_with_retry(url, headers=get_http_headers(), timeout=30)
-    reader = csv.DictReader(response.text.splitlines())
-    rows: List[PriceRow] = []
-    for item in reader:
-        if not item.get("Date"):
-            continue
-        rows.append(
-            PriceRow(
-                date=item["Date"],
-                open=float(item.get("Open") or 0.0),
-                high=float(item.get("High") or 0.0),
-                low=float(item.get("Low") or 0.0),
-                close=float(item.get("Close") or 0.0),
-                volume=float(item.get("Volume") or 0.0),
-                source="stooq",
-            )
-        )
-    return rows
-
-
+    try:
+        frame = pd.read_csv(io.StringIO(response.text), dtype={"Date": str})
+    except pd.errors.EmptyDataError:
+        return []
+    if "Date" not in frame.columns:
+        return []
+    frame = frame.dropna(subset=["Date"])
+    columns = [
+        frame[name].fillna(0.0).to_numpy(dtype=np.float64).tolist() if name in frame.columns else [0.0] * len(frame)
+        for name in _STOOQ_PRICE_COLUMNS
+    ]
+    return [
+        PriceRow(date=date_str, open=open_, high=high, low=low, close=close, volume=volume, source="stooq")
+        for date_str, open_, high, low, close, volume in zip(frame["Date"].tolist(), *columns)
+    ]
+
+
+@_cached_fetch("finmind_daily", encode=_encode_rows, decode=_decode_rows)
 def fetch_finmind_daily(
     symbol: str,
     start_date: date,
@@ -62,7 +122,7 @@ def fetch_finmind_daily(
         headers=get_http_headers(),
         timeout=30,
     )
-    payload = response.json()
+    payload = loads_json(response.content)
     data = payload.get("data", []) if isinstance(payload, dict) else []
     rows: List[PriceRow] = []
     for item in data:
@@ -80,6 +140,7 @@ def fetch_finmind_daily(
     return rows
 
 
+@_cached_fetch("yfinance_daily", encode=_encode_rows, decode=_decode_rows)
 def fetch_yfinance_daily(symbol: str, start_date: date, end_date: date) -> List[PriceRow]:
     if yf is None:
         return []
@@ -103,16 +164,14 @@ def fetch_yfinance_daily(symbol: str, start_date: date, end_date: date) -> List[
     return rows
 
 
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
 def filter_by_date(rows: List[PriceRow], start_date: date, end_date: date) -> List[PriceRow]:
-    filtered = []
-    for item in rows:
-        try:
-            item_date = datetime.strptime(item.date, "%Y-%m-%d").date()
-        except ValueError:
-            continue
-        if start_date <= item_date <= end_date:
-            filtered.append(item)
-    filtered.sort(key=lambda x: x.date)
+    start = start_date.isoformat()
+    end = end_date.isoformat()
+    filtered = [item for item in rows if start <= item.date <= end and _ISO_DATE.fullmatch(item.date)]
+    filtered.sort(key=attrgetter("date"))
     return filtered
 
 
@@ -124,7 +183,7 @@ def parse_rss_items(xml_text: str) -> List[Dict[str, str]]:
         root = ET.fromstring(xml_text)
     except ET.ParseError:
         return items
-    for node in root.findall(".//item"):
+    for node in root.iter("item"):
         title = node.findtext("title", default="").strip()
         link = node.findtext("link", default="").strip()
         pub = node.findtext("pubDate", default="").strip()
@@ -138,6 +197,7 @@ def parse_rss_items(xml_text: str) -> List[Dict[str, str]]:
     return items
 
 
+@_cached_fetch("google_news", ttl_sec=_news_ttl_sec, encode=_copy_items, decode=_copy_items)
 def fetch_google_news(query: str, locale: str) -> List[Dict[str, str]]:
     params = {"q": query}
     if locale == "tw":
@@ -153,6 +213,7 @@ def fetch_google_news(query: str, locale: str) -> List[Dict[str, str]]:
     return parse_rss_items(response.text)
 
 
+@_cached_fetch("reddit", ttl_sec=_news_ttl_sec, encode=_copy_items, decode=_copy_items)
 def fetch_reddit_search(query: str) -> List[Dict[str, str]]:
     params = {
         "q": query,
@@ -167,7 +228,7 @@ def fetch_reddit_search(query: str) -> List[Dict[str, str]]:
         headers=get_http_headers(),
         timeout=30,
     )
-    payload = response.json()
+    payload = loads_json(response.content)
     items = []
     for child in payload.get("data", {}).get("children", []):
         data = child.get("data", {})
@@ -182,10 +243,11 @@ def fetch_reddit_search(query: str) -> List[Dict[str, str]]:
     return items
 
 
+@_cached_fetch("stocktwits", ttl_sec=_news_ttl_sec, encode=_copy_items, decode=_copy_items)
 def fetch_stocktwits(symbol: str) -> List[Dict[str, str]]:
     url = f"https://api.stocktwits.com/api/2/streams/symbol/{symbol}.json"
     response = request_with_retry(url, headers=get_http_headers(), timeout=30)
-    payload = response.json()
+    payload = loads_json(response.content)
     items = []
     for message in payload.get("messages", []):
         items.append(
@@ -199,6 +261,7 @@ def fetch_stocktwits(symbol: str) -> List[Dict[str, str]]:
     return items
 
 
+@_cached_fetch("ptt", ttl_sec=_news_ttl_sec, encode=_copy_items, decode=_copy_items)
 def fetch_ptt_search(query: str) -> List[Dict[str, str]]:
     url = f"https://www.ptt.cc/bbs/Stock/search?q={query}"
     response = request_with_retry(
@@ -207,7 +270,7 @@ def fetch_ptt_search(query: str) -> List[Dict[str, str]]:
         cookies={"over18": "1"},
         timeout=30,
     )
-    soup = BeautifulSoup(response.text, "html.parser")
+    soup = BeautifulSoup(response.text, _HTML_PARSER)
     items = []
     for entry in soup.select("div.r-ent a"):
         link = entry.get("href", "")
@@ -227,13 +290,15 @@ def fetch_ptt_search(query: str) -> List[Dict[str, str]]:
     return items[:10]
 
 
+@_cached_fetch("sec_companyfacts", ttl_sec=lambda: -1)
 def fetch_sec_companyfacts(cik: str) -> Dict[str, Any]:
     cik = cik.zfill(10)
     url = f"https://data.sec.gov/api/xbrl/companyfacts/CIK{cik}.json"
     response = request_with_retry(url, headers=get_http_headers(), timeout=30)
-    return response.json()
+    return loads_json(response.content)
 
 
+@_cached_fetch("finmind_financials", ttl_sec=lambda: -1, keep=lambda payload: bool(payload.get("data")))
 def fetch_finmind_financials(symbol: str, start_date: date, end_date: date, token: str) -> Dict[str, Any]:
     if not token:
         return {}
@@ -250,7 +315,7 @@ def fetch_finmind_financials(symbol: str, start_date: date, end_date: date, toke
         headers=get_http_headers(),
         timeout=30,
     )
-    return response.json()
+    return loads_json(response.content)
 
 
 def get_symbol_query(symbol: str, metadata: Dict[str, Any], market: str) -> str:
@@ -1,16 +1,54 @@
 import json
 import os
+import threading
 import time
+from datetime import datetime, timezone
 from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
 
 import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:  # optional
+    import orjson
+except Exception:  # pragma: no cover - optional dependency at runtime
+    orjson = None
+
+
+_ENV_LOADED = False
+
+
+def load_env() -> None:
+    global _ENV_LOADED
+    if _ENV_LOADED:
+        return
+    load_dotenv()
+    _ENV_LOADED = True
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
 def load_json(path: str) -> Dict[str, Any]:
     if not os.path.exists(path):
         return {}
-    with open(path, "r", encoding="utf-8") as handle:
-        return json.load(handle)
+    with open(path, "rb") as handle:
+        return loads_json(handle.read().removeprefix(b"\xef\xbb\xbf"))
+
+
+def dumps_json(payload: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_json(text: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
 
 
 def get_http_headers() -> Dict[str, str]:
@@ -18,7 +56,59 @@ def get_http_headers() -> Dict[str, str]:
     return {"User-Agent": agent}
 
 
-_LAST_REQUEST_TS: Optional[float] = None
+_SESSIONS: Dict[bool, requests.Session] = {}
+_SESSION_LOCK = threading.Lock()
+
+
+def _new_session(retry: bool) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        if retry
+        else 0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session(retry: bool = True) -> requests.Session:
+    with _SESSION_LOCK:
+        session = _SESSIONS.get(retry)
+        if session is None:
+            session = _new_session(retry)
+            _SESSIONS[retry] = session
+        return session
+
+
+_LAST_REQUEST_TS: Dict[str, float] = {}
+_REQUEST_TS_LOCK = threading.Lock()
+
+
+def _wait_for_host(url: str, min_interval: float) -> None:
+    if min_interval <= 0:
+        return
+    host = urlsplit(url).netloc
+    with _REQUEST_TS_LOCK:
+        now = time.time()
+        slot = max(now, _LAST_REQUEST_TS.get(host, 0.0) + min_interval)
+        _LAST_REQUEST_TS[host] = slot
+    if slot > now:
+        time.sleep(slot - now)
+
+
+def _mark_host_done(url: str) -> None:
+    host = urlsplit(url).netloc
+    with _REQUEST_TS_LOCK:
+        _LAST_REQUEST_TS[host] = max(_LAST_REQUEST_TS.get(host, 0.0), time.time())
 
 
 def request_with_retry(
@@ -32,14 +122,14 @@ def request_with_retry(
     backoff_sec = float(os.getenv("REQUEST_BACKOFF_SEC", "1.5") or 1.5)
     min_interval = float(os.getenv("REQUEST_MIN_INTERVAL_SEC", "0.5") or 0.5)
 
-    global _LAST_REQUEST_TS
     for attempt in range(1, max_retries + 1):
-        if _LAST_REQUEST_TS is not None and min_interval > 0:
-            elapsed = time.time() - _LAST_REQUEST_TS
-            if elapsed < min_interval:
-                time.sleep(min_interval - elapsed)
-        response = requests.get(url, params=params, headers=headers, cookies=cookies, timeout=timeout)
-        _LAST_REQUEST_TS = time.time()
+        _wait_for_host(url, min_interval)
+        try:
+            response = get_http_session(retry=False).get(
+                url, params=params, headers=headers, cookies=cookies, timeout=timeout
+            )
+        finally:
+            _mark_host_done(url)
         if response.status_code in {429, 500, 502, 503, 504} and attempt < max_retries:
             time.sleep(backoff_sec * (2 ** (attempt - 1)))
             continue
@@ -61,4 +151,4 @@ def safe_call(label: str, func: Callable, default, log=None):
 
 
 def strip_tw_symbol(symbol: str) -> str:
-    return symbol.split(".")[0]
+    return symbol.partition(".")[0]
@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 import time
 from typing import Any, Dict, List, Optional
 
@@ -10,26 +11,66 @@ try:
 except Exception:  # pragma: no cover - optional dependency at runtime
     genai = None
 
+from stockcheck.pipeline.utils import dumps_json, get_http_session, loads_json
+
 from .models import InstitutionalSnapshot, TickerSnapshot
 
 
-def snapshot_to_dict(snapshot: TickerSnapshot) -> Dict[str, Any]:
-    return {
-        "symbol": snapshot.symbol,
-        "price": snapshot.price,
-        "change": snapshot.change,
-        "change_pct": snapshot.change_pct,
-        "previous_close": snapshot.previous_close,
-        "volume": snapshot.volume,
-        "ma50": snapshot.ma50,
-        "ma200": snapshot.ma200,
-        "earnings_date": snapshot.earnings_date,
-        "earnings_today": snapshot.earnings_today,
-        "news": snapshot.news,
-    }
+_SNAPSHOT_FIELDS = (
+    "symbol",
+    "price",
+    "change",
+    "change_pct",
+    "previous_close",
+    "volume",
+    "ma50",
+    "ma200",
+    "earnings_date",
+    "earnings_today",
+    "news",
+)
 
 
-def build_prompt(
+_PRICE_FIELDS = ("price", "change", "change_pct", "previous_close", "ma50", "ma200")
+_NEWS_TITLE_LIMIT = 120
+
+
+def snapshots_to_columns(snapshots: List[TickerSnapshot]) -> Dict[str, List[Any]]:
+    columns = {name: [getattr(snapshot, name) for snapshot in snapshots] for name in _SNAPSHOT_FIELDS}
+    for name in _PRICE_FIELDS:
+        columns[name] = [round(value, 2) for value in columns[name]]
+    columns["volume"] = [round(value) for value in columns["volume"]]
+    columns["news"] = [
+        [str(item.get("title", ""))[:_NEWS_TITLE_LIMIT] for item in news] for news in columns["news"]
+    ]
+    return columns
+
+
+def _round_optional(value: Any, digits: int = 2) -> Any:
+    return round(value, digits) if isinstance(value, float) else value
+
+
+def _trim_pipeline_context(pipeline_context: Dict[str, Any]) -> Dict[str, Any]:
+    trimmed: Dict[str, Any] = {}
+    for symbol, payload in pipeline_context.items():
+        item = dict(payload)
+        if "indicators" in item:
+            item["indicators"] = {name: _round_optional(value) for name, value in item["indicators"].items()}
+        if "news" in item:
+            item["news"] = [str(news.get("title", ""))[:_NEWS_TITLE_LIMIT] for news in item["news"]]
+        if "sentiment" in item:
+            item["sentiment"] = [
+                {
+                    "title": str(entry.get("title", ""))[:_NEWS_TITLE_LIMIT],
+                    "score": _round_optional(entry.get("score")),
+                }
+                for entry in item["sentiment"]
+            ]
+        trimmed[symbol] = item
+    return trimmed
+
+
+def build_data_blob(
     market: str,
     snapshots: List[TickerSnapshot],
     indices: List[TickerSnapshot],
@@ -40,32 +81,61 @@ def build_prompt(
     data = {
         "market": market,
         "timestamp": timestamp,
-        "watchlist": [snapshot_to_dict(s) for s in snapshots],
-        "indices": [snapshot_to_dict(s) for s in indices],
+        "watchlist": snapshots_to_columns(snapshots),
+        "indices": snapshots_to_columns(indices),
         "institutional": [
             {
                 "symbol": item.symbol,
                 "date": item.date,
-                "total_net": item.total_net,
-                "net_by_name": item.net_by_name,
+                "total_net": round(item.total_net),
+                "net_by_name": {name: round(value) for name, value in item.net_by_name.items()},
             }
             for item in institutional
         ],
-        "pipeline": pipeline_context,
+        "pipeline": _trim_pipeline_context(pipeline_context),
     }
-    schema = {
+    return dumps_json(data)
+
+
+_PROMPT_SCHEMA = dumps_json(
+    {
         "summary": "string (Chinese, 400-600 chars, 3 paragraphs: 大盤/重要個股/風險)",
         "predictions": "object mapping symbol -> up|down|neutral",
     }
-    return (
-        "請用中文輸出 JSON，且只輸出 JSON。"
-        "summary 需 400-600 字，分成三段：大盤、重要個股、風險。"
-        "predictions 要針對 watchlist symbol，輸出 up/down/neutral。"
-        "JSON schema: "
-        + json.dumps(schema, ensure_ascii=False)
-        + "資料如下："
-        + json.dumps(data, ensure_ascii=False)
-    )
+)
+
+
+_PROMPT_PREFIX = (
+    "請用中文輸出 JSON，且只輸出 JSON。"
+    "summary 需 400-600 字，分成三段：大盤、重要個股、風險。"
+    "predictions 要針對 watchlist symbol，輸出 up/down/neutral。"
+    "watchlist 與 indices 為欄位陣列格式，同一索引代表同一檔標的。"
+    "JSON schema: " + _PROMPT_SCHEMA + "資料如下："
+)
+
+_RETRY_PROMPT_PREFIX = (
+    "請用中文輸出 JSON，且只輸出 JSON。summary 需 400-600 字，"
+    "分成三段：大盤、重要個股、風險。predictions 必須回傳 up/down/neutral。"
+    "watchlist 與 indices 為欄位陣列格式，同一索引代表同一檔標的。資料如下："
+)
+
+
+def build_prompt(
+    market: str,
+    snapshots: List[TickerSnapshot],
+    indices: List[TickerSnapshot],
+    institutional: List[InstitutionalSnapshot],
+    pipeline_context: Dict[str, Any],
+    timestamp: str,
+    data_blob: Optional[str] = None,
+) -> str:
+    if data_blob is None:
+        data_blob = build_data_blob(market, snapshots, indices, institutional, pipeline_context, timestamp)
+    return _PROMPT_PREFIX + data_blob
+
+
+def build_retry_prompt(data_blob: str) -> str:
+    return _RETRY_PROMPT_PREFIX + data_blob
 
 
 def build_fallback_summary(
@@ -82,15 +152,18 @@ def build_fallback_summary(
         )
     index_text = "，".join(index_lines) if index_lines else "指數資料不足"
 
+    top_snapshots = snapshots[:4]
+    news_lookup = {
+        item.symbol: (pipeline_context.get(item.symbol) or {}).get("news") or [] for item in top_snapshots
+    }
     watchlist_lines = []
-    for item in snapshots[:4]:
+    for item in top_snapshots:
         if item.ma50 <= 0 or item.ma200 <= 0:
             trend = "資料不足"
         else:
             trend = "強勢" if item.price >= item.ma50 >= item.ma200 else "偏弱"
         news_note = ""
-        context = pipeline_context.get(item.symbol, {})
-        news_items = context.get("news") or []
+        news_items = news_lookup[item.symbol]
         if news_items:
             news_note = f"，焦點：{news_items[0].get('title', '')[:20]}"
         watchlist_lines.append(
@@ -117,6 +190,19 @@ def build_fallback_summary(
     )
 
 
+_GEMINI_CLIENTS: Dict[str, Any] = {}
+_GEMINI_CLIENT_LOCK = threading.Lock()
+
+
+def _get_gemini_client(api_key: str):
+    with _GEMINI_CLIENT_LOCK:
+        client = _GEMINI_CLIENTS.get(api_key)
+        if client is None:
+            client = genai.Client(api_key=api_key)
+            _GEMINI_CLIENTS[api_key] = client
+        return client
+
+
 def call_gemini(prompt: str) -> str:
     api_key = os.getenv("GEMINI_API_KEY", "")
     if not api_key:
@@ -125,7 +211,7 @@ def call_gemini(prompt: str) -> str:
         return "google-genai not installed; skipped AI summary."
 
     model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-    client = genai.Client(api_key=api_key)
+    client = _get_gemini_client(api_key)
     max_tokens = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "800") or 800)
     max_retries = int(os.getenv("AI_MAX_RETRIES", "2") or 2)
     backoff_sec = float(os.getenv("AI_BACKOFF_SEC", "1.5") or 1.5)
@@ -164,7 +250,7 @@ def call_openrouter(prompt: str) -> str:
     timeout_sec = float(os.getenv("OPENROUTER_TIMEOUT_SEC", "60") or 60)
     for attempt in range(1, max_retries + 1):
         try:
-            response = requests.post(
+            response = get_http_session().post(
                 "https://openrouter.ai/api/v1/chat/completions",
                 headers={
                     "Authorization": f"Bearer {api_key}",
@@ -181,11 +267,11 @@ def call_openrouter(prompt: str) -> str:
                 timeout=timeout_sec,
             )
             response.raise_for_status()
-            payload = response.json()
+            payload = loads_json(response.content)
             choice = (payload.get("choices") or [{}])[0]
             content = choice.get("message", {}).get("content", "")
             return content.strip() or "OpenRouter response was empty."
-        except requests.RequestException as exc:
+        except (requests.RequestException, ValueError) as exc:
             detail = ""
             try:
                 detail = response.text
@@ -197,31 +283,50 @@ def call_openrouter(prompt: str) -> str:
             time.sleep(backoff_sec * (2 ** (attempt - 1)))
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _as_response(parsed: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(parsed, dict) and ("summary" in parsed or "predictions" in parsed):
+        return parsed
+    return None
+
+
 def _extract_json(text: str) -> Optional[Dict[str, Any]]:
     text = text.strip()
     try:
-        parsed = json.loads(text)
+        parsed = loads_json(text)
         if isinstance(parsed, dict):
-            return parsed
+            return _as_response(parsed)
     except json.JSONDecodeError:
         pass
     start = text.find("{")
-    end = text.rfind("}")
-    if start == -1 or end == -1 or end <= start:
+    if start == -1:
         return None
     try:
-        parsed = json.loads(text[start : end + 1])
-        if isinstance(parsed, dict):
-            return parsed
+        parsed, _ = _JSON_DECODER.raw_decode(text, start)
     except json.JSONDecodeError:
         return None
-    return None
+    return _as_response(parsed)
+
+
+_SUMMARY_SECTIONS = ("大盤", "重要個股", "風險")
+
+
+def is_acceptable_summary(text: str) -> bool:
+    length = len(text)
+    if length >= 400:
+        return True
+    return length >= 350 and all(section in text for section in _SUMMARY_SECTIONS)
+
+
+_PREDICTION_VALUES = frozenset({"up", "down", "neutral"})
 
 
 def parse_ai_response(response_text: str, symbols: List[str]) -> Dict[str, Any]:
     parsed = _extract_json(response_text)
     summary = response_text.strip()
-    predictions = {symbol: "unknown" for symbol in symbols}
+    predictions = dict.fromkeys(symbols, "unknown")
     valid_json = False
 
     if parsed:
@@ -230,8 +335,10 @@ def parse_ai_response(response_text: str, symbols: List[str]) -> Dict[str, Any]:
         parsed_predictions = parsed.get("predictions", {}) or {}
         if isinstance(parsed_predictions, dict):
             for symbol in symbols:
-                value = str(parsed_predictions.get(symbol, "unknown")).lower()
-                if value in {"up", "down", "neutral"}:
+                value = parsed_predictions.get(symbol, "unknown")
+                if not (isinstance(value, str) and value in _PREDICTION_VALUES):
+                    value = str(value).lower()
+                if value in _PREDICTION_VALUES:
                     predictions[symbol] = value
 
     return {"summary": summary, "predictions": predictions, "valid_json": valid_json}
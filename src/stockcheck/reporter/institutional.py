@@ -1,13 +1,18 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
-import requests
+from stockcheck.pipeline.cache import get_cache
+from stockcheck.pipeline.utils import get_http_session, loads_json, strip_tw_symbol
 
 from .models import InstitutionalSnapshot
 
 
-def strip_tw_symbol(symbol: str) -> str:
-    return symbol.split(".")[0]
+def _get_worker_count(target: int) -> int:
+    env_value = int(os.getenv("FINMIND_MAX_WORKERS", "8") or 8)
+    return max(1, min(env_value, target))
 
 
 def fetch_finmind_institutional(
@@ -18,6 +23,12 @@ def fetch_finmind_institutional(
     if not token:
         return None
 
+    cache = get_cache()
+    cache_key = f"finmind_institutional_{report_date.isoformat()}"
+    cached = cache.get(symbol, cache_key)
+    if cached is not None:
+        return InstitutionalSnapshot(**cached)
+
     start_date = (report_date - timedelta(days=14)).isoformat()
     end_date = report_date.isoformat()
     params = {
@@ -27,21 +38,37 @@ def fetch_finmind_institutional(
         "end_date": end_date,
         "token": token,
     }
-    response = requests.get("https://api.finmindtrade.com/api/v4/data", params=params, timeout=30)
+    response = get_http_session().get("https://api.finmindtrade.com/api/v4/data", params=params, timeout=30)
     response.raise_for_status()
-    payload = response.json()
+    snapshot = parse_finmind_institutional(symbol, loads_json(response.content))
+    if snapshot:
+        cache.set(
+            symbol,
+            cache_key,
+            {
+                "symbol": snapshot.symbol,
+                "date": snapshot.date,
+                "total_net": snapshot.total_net,
+                "net_by_name": snapshot.net_by_name,
+            },
+        )
+    return snapshot
+
+
+def parse_finmind_institutional(symbol: str, payload: Any) -> Optional[InstitutionalSnapshot]:
     data = payload.get("data", []) if isinstance(payload, dict) else []
     if not data:
         return None
 
-    latest = max(data, key=lambda item: item.get("date", ""))
-    date_str = str(latest.get("date", ""))
-
-    grouped: Dict[str, float] = {}
+    latest = None
+    grouped: Dict[str, float] = defaultdict(float)
     for item in data:
-        if item.get("date") != date_str:
+        item_date = item.get("date", "")
+        if latest is None or item_date > latest:
+            latest = item_date
+            grouped = defaultdict(float)
+        elif item_date != latest:
             continue
-        name = str(item.get("name", "")).strip() or "Unknown"
         buy = item.get("buy")
         sell = item.get("sell")
         if buy is None:
@@ -54,16 +81,17 @@ def fetch_finmind_institutional(
             net = float(buy) - float(sell)
         except (TypeError, ValueError):
             continue
-        grouped[name] = grouped.get(name, 0.0) + net
+        grouped[str(item.get("name", "")).strip() or "Unknown"] += net
 
+    date_str = str(latest)
+    grouped = dict(grouped)
     total_net = sum(grouped.values())
     return InstitutionalSnapshot(symbol=symbol, date=date_str, total_net=total_net, net_by_name=grouped)
 
 
 def collect_finmind_data(symbols: List[str], report_date: datetime.date, token: str) -> List[InstitutionalSnapshot]:
-    snapshots = []
-    for symbol in symbols:
-        item = fetch_finmind_institutional(symbol, report_date, token)
-        if item:
-            snapshots.append(item)
-    return snapshots
+    if not token or not symbols:
+        return []
+    with ThreadPoolExecutor(max_workers=_get_worker_count(len(symbols))) as executor:
+        results = list(executor.map(lambda symbol: fetch_finmind_institutional(symbol, report_date, token), symbols))
+    return [item for item in results if item]
@@ -1,4 +1,5 @@
 import os
+import threading
 from typing import Any, Dict, List
 
 try:
@@ -53,6 +54,19 @@ def build_flex_contents(message: str) -> Dict[str, Any]:
     }
 
 
+_MESSAGING_APIS: Dict[str, Any] = {}
+_MESSAGING_API_LOCK = threading.Lock()
+
+
+def _get_messaging_api(token: str):
+    with _MESSAGING_API_LOCK:
+        messaging_api = _MESSAGING_APIS.get(token)
+        if messaging_api is None:
+            messaging_api = MessagingApi(ApiClient(Configuration(access_token=token)))
+            _MESSAGING_APIS[token] = messaging_api
+        return messaging_api
+
+
 def send_line_message(message: str) -> None:
     token = os.getenv("LINE_CHANNEL_ACCESS_TOKEN", "")
     user_id = os.getenv("LINE_USER_ID", "")
@@ -64,21 +78,19 @@ def send_line_message(message: str) -> None:
         print(f"line-bot-sdk not installed; skipping LINE Messaging API push.{detail}")
         return
 
-    configuration = Configuration(access_token=token)
-    with ApiClient(configuration) as api_client:
-        messaging_api = MessagingApi(api_client)
-        try:
-            print(f"準備發送報告給用戶 {user_id}...")
-            if os.getenv("LINE_USE_FLEX", "").lower() in {"1", "true", "yes"} and FlexMessage:
-                contents = build_flex_contents(message)
-                container = FlexContainer.from_json(contents)
-                flex_message = FlexMessage(alt_text="股票分析報告已送達", contents=container)
-                payload: List[Any] = [flex_message]
-            else:
-                payload = [TextMessage(text=message)]
+    messaging_api = _get_messaging_api(token)
+    try:
+        print(f"準備發送報告給用戶 {user_id}...")
+        if os.getenv("LINE_USE_FLEX", "").lower() in {"1", "true", "yes"} and FlexMessage:
+            contents = build_flex_contents(message)
+            container = FlexContainer.from_json(contents)
+            flex_message = FlexMessage(alt_text="股票分析報告已送達", contents=container)
+            payload: List[Any] = [flex_message]
+        else:
+            payload = [TextMessage(text=message)]
 
-            messaging_api.push_message(PushMessageRequest(to=user_id, messages=payload))
-            print("✅ 訊息發送成功！")
-        except Exception as exc:
-            print(f"❌ 訊息發送失敗，錯誤原因: {exc}")
-            raise RuntimeError(f"LINE Messaging API failed: {exc}") from exc
+        messaging_api.push_message(PushMessageRequest(to=user_id, messages=payload))
+        print("✅ 訊息發送成功！")
+    except Exception as exc:
+        print(f"❌ 訊息發送失敗，錯誤原因: {exc}")
+        raise RuntimeError(f"LINE Messaging API failed: {exc}") from exc
@@ -1,19 +1,51 @@
+import functools
+import io
 import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+import pandas as pd
 import yfinance as yf
+from yfinance.exceptions import YFInvalidPeriodError, YFPricesMissingError, YFTickerMissingError
+
+from stockcheck.pipeline.cache import get_cache
 
 from .models import TickerSnapshot
 
 
+@functools.lru_cache(maxsize=1)
 def get_yfinance_settings() -> Dict[str, float]:
     retries = int(os.getenv("YFINANCE_RETRIES", "3") or 3)
     delay_sec = float(os.getenv("YFINANCE_DELAY_SEC", "1.5") or 1.5)
     return {"retries": retries, "delay_sec": delay_sec}
 
 
+def _get_worker_count(target: int) -> int:
+    env_value = int(os.getenv("YFINANCE_MAX_WORKERS", "8") or 8)
+    return max(1, min(env_value, target))
+
+
+@functools.lru_cache(maxsize=256)
+def _get_ticker(symbol: str) -> yf.Ticker:
+    return yf.Ticker(symbol)
+
+
+_PERMANENT_ERRORS = (YFTickerMissingError, YFInvalidPeriodError)
+
+
+def _is_permanent(exc: Exception) -> bool:
+    # YFPricesMissingError subclasses YFTickerMissingError, but Yahoo returns empty prices transiently.
+    return isinstance(exc, _PERMANENT_ERRORS) and not isinstance(exc, YFPricesMissingError)
+
+
+def _backoff_delay(delay_sec: float, attempt: int) -> float:
+    return min(delay_sec * (2 ** (attempt - 1)), 30.0) + random.uniform(0, 0.5)
+
+
 def fetch_history(ticker: yf.Ticker, period: str, retries: Optional[int] = None, delay_sec: Optional[float] = None):
     settings = get_yfinance_settings()
     retries = settings["retries"] if retries is None else retries
@@ -22,62 +54,192 @@ def fetch_history(ticker: yf.Ticker, period: str, retries: Optional[int] = None,
     last_error = None
     for attempt in range(1, retries + 1):
         try:
-            return ticker.history(period=period)
+            return ticker.history(period=period, raise_errors=True)
         except Exception as exc:
+            if _is_permanent(exc):
+                raise
             last_error = exc
             print(f"History fetch failed period={period} attempt={attempt}: {exc}")
-            time.sleep(delay_sec)
+            if attempt < retries:
+                time.sleep(_backoff_delay(delay_sec, attempt))
     if last_error:
         raise last_error
-    return ticker.history(period=period)
+    return ticker.history(period=period, raise_errors=True)
+
+
+def _history_cache_key(period: str, report_date: datetime.date) -> str:
+    return f"history_{period}_{report_date.isoformat()}"
+
+
+def _load_cached_history(symbol: str, period: str, report_date: datetime.date):
+    payload = get_cache().get(symbol, _history_cache_key(period, report_date))
+    if payload is None:
+        return None
+    try:
+        return pd.read_json(io.StringIO(payload), orient="split")
+    except ValueError:
+        return None
 
 
-def get_price_snapshot(symbol: str, report_date: datetime.date) -> TickerSnapshot:
-    ticker = yf.Ticker(symbol)
-    history = fetch_history(ticker, "2d")
+def _store_cached_history(symbol: str, period: str, report_date: datetime.date, history) -> None:
     if history.empty:
-        raise ValueError(f"No price data for {symbol}")
+        return
+    payload = history.to_json(orient="split", date_format="iso", double_precision=15)
+    get_cache().set(symbol, _history_cache_key(period, report_date), payload)
 
-    latest = history.iloc[-1]
-    previous = history.iloc[-2] if len(history) > 1 else latest
-    price = float(latest["Close"])
-    previous_close = float(previous["Close"])
-    change = price - previous_close
-    change_pct = (change / previous_close) * 100 if previous_close else 0.0
 
-    volume = float(latest.get("Volume", 0.0) or 0.0)
+def download_histories(symbols: List[str], report_date: datetime.date, period: str = "1y") -> Dict[str, Any]:
+    histories: Dict[str, Any] = {}
+    missing: List[str] = []
+    for symbol in symbols:
+        cached = _load_cached_history(symbol, period, report_date)
+        if cached is None or cached.empty:
+            missing.append(symbol)
+        else:
+            histories[symbol] = cached
+    if not missing:
+        return histories
 
-    long_history = fetch_history(ticker, "1y")
-    ma50 = float(long_history["Close"].tail(50).mean()) if not long_history.empty else 0.0
-    ma200 = float(long_history["Close"].tail(200).mean()) if not long_history.empty else 0.0
+    settings = get_yfinance_settings()
+    data = None
+    for attempt in range(1, settings["retries"] + 1):
+        try:
+            data = yf.download(
+                missing,
+                period=period,
+                group_by="ticker",
+                auto_adjust=True,
+                threads=True,
+                progress=False,
+            )
+            break
+        except Exception as exc:
+            print(f"Batch download failed period={period} attempt={attempt}: {exc}")
+            if attempt < settings["retries"]:
+                time.sleep(_backoff_delay(settings["delay_sec"], attempt))
+    if data is None or data.empty:
+        return histories
 
-    earnings_date = ""
-    earnings_today = False
-    news_items = []
-    is_index = symbol.startswith("^")
-    if not is_index:
+    is_grouped = isinstance(data.columns, pd.MultiIndex)
+    tickers = set(data.columns.get_level_values(0)) if is_grouped else set()
+    for symbol in missing:
+        if is_grouped:
+            if symbol not in tickers:
+                continue
+            frame = data[symbol]
+        elif len(missing) == 1:
+            frame = data
+        else:
+            continue
+        frame = frame.dropna(subset=["Close"])
+        if not frame.empty:
+            histories[symbol] = frame
+            _store_cached_history(symbol, period, report_date, frame)
+    return histories
+
+
+_EARNINGS_RECHECK_DAYS = 30
+
+
+def _known_future_earnings(symbol: str, report_date: datetime.date) -> Optional[str]:
+    known = get_cache().get(symbol, "calendar_latest", ttl_sec=-1)
+    if not known:
+        return None
+    try:
+        earnings = datetime.strptime(known, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+    if (earnings - report_date).days > _EARNINGS_RECHECK_DAYS:
+        return known
+    return None
+
+
+def _next_earnings_date(calendar: Any, report_date: datetime.date) -> str:
+    dates = (calendar or {}).get("Earnings Date") or []
+    upcoming = sorted(item for item in dates if item >= report_date)
+    return upcoming[0].isoformat() if upcoming else ""
+
+
+def fetch_events(symbol: str, ticker: Optional[yf.Ticker], report_date: datetime.date) -> Tuple[str, List[Dict[str, str]]]:
+    cache = get_cache()
+    date_key = report_date.isoformat()
+    news_ttl_sec = float(os.getenv("NEWS_CACHE_TTL_SEC", "1800") or 1800)
+    include_news = os.getenv("INCLUDE_NEWS", "true").lower() in {"1", "true", "yes"}
+    earnings_date = cache.get(symbol, f"calendar_{date_key}")
+    if earnings_date is None:
+        earnings_date = _known_future_earnings(symbol, report_date)
+    news_items = cache.get(symbol, f"news_{date_key}", ttl_sec=news_ttl_sec) if include_news else []
+
+    if earnings_date is None:
+        ticker = ticker or _get_ticker(symbol)
         try:
-            calendar = ticker.calendar
-            if not calendar.empty:
-                earnings_ts = calendar.iloc[0, 0]
-                earnings_date = str(earnings_ts.date())
-                earnings_today = earnings_ts.date() == report_date
+            earnings_date = _next_earnings_date(ticker.calendar, report_date)
+            cache.set(symbol, f"calendar_{date_key}", earnings_date)
+            if earnings_date:
+                cache.set(symbol, "calendar_latest", earnings_date)
         except Exception:
             earnings_date = ""
-            earnings_today = False
 
+    if news_items is None:
+        ticker = ticker or _get_ticker(symbol)
         try:
-            for item in (ticker.news or [])[:3]:
-                news_items.append(
-                    {
-                        "title": item.get("title", ""),
-                        "link": item.get("link", ""),
-                        "publisher": item.get("publisher", ""),
-                    }
-                )
+            news_items = [
+                {
+                    "title": item.get("title", ""),
+                    "link": item.get("link", ""),
+                    "publisher": item.get("publisher", ""),
+                }
+                for item in (ticker.news or [])[:3]
+            ]
+            cache.set(symbol, f"news_{date_key}", news_items)
         except Exception:
             news_items = []
 
+    return earnings_date, news_items
+
+
+def _close_stats(closes: np.ndarray) -> Tuple[float, float, float, float]:
+    price = float(closes[-1])
+    previous_close = float(closes[-2]) if closes.size > 1 else price
+    ma50 = float(closes[-50:].mean())
+    ma200 = float(closes[-200:].mean())
+    return price, previous_close, ma50, ma200
+
+
+def snapshot_from_frame(
+    symbol: str,
+    history,
+    report_date: datetime.date,
+    ticker: Optional[yf.Ticker] = None,
+    include_events: Optional[bool] = None,
+) -> TickerSnapshot:
+    if history.empty:
+        raise ValueError(f"No price data for {symbol}")
+
+    closes = history["Close"].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(closes)
+    closes = closes[valid]
+    if not closes.size:
+        raise ValueError(f"No price data for {symbol}")
+    price, previous_close, ma50, ma200 = _close_stats(closes)
+    change = price - previous_close
+    change_pct = (change / previous_close) * 100 if previous_close else 0.0
+
+    volume = 0.0
+    if "Volume" in history:
+        volumes = history["Volume"].to_numpy(dtype=np.float64)[valid]
+        if volumes.size and not np.isnan(volumes[-1]):
+            volume = float(volumes[-1])
+
+    earnings_date = ""
+    earnings_today = False
+    news_items = []
+    if include_events is None:
+        include_events = not symbol.startswith("^")
+    if include_events:
+        earnings_date, news_items = fetch_events(symbol, ticker, report_date)
+        earnings_today = earnings_date == report_date.isoformat()
+
     return TickerSnapshot(
         symbol=symbol,
         price=price,
@@ -93,14 +255,48 @@ def get_price_snapshot(symbol: str, report_date: datetime.date) -> TickerSnapsho
     )
 
 
-def collect_market_data(symbols: List[str], report_date: datetime.date) -> List[TickerSnapshot]:
-    snapshots = []
-    for symbol in symbols:
+@functools.lru_cache(maxsize=256)
+def _get_history(symbol: str, period: str, report_date: datetime.date):
+    history = _load_cached_history(symbol, period, report_date)
+    if history is None or history.empty:
+        history = fetch_history(_get_ticker(symbol), period)
+        _store_cached_history(symbol, period, report_date, history)
+    return history
+
+
+def get_price_snapshot(
+    symbol: str,
+    report_date: datetime.date,
+    include_events: Optional[bool] = None,
+) -> TickerSnapshot:
+    history = _get_history(symbol, "1y", report_date)
+    return snapshot_from_frame(symbol, history, report_date, _get_ticker(symbol), include_events)
+
+
+def collect_market_data(
+    symbols: List[str],
+    report_date: datetime.date,
+    histories: Optional[Dict[str, Any]] = None,
+    include_events: Optional[bool] = None,
+) -> List[TickerSnapshot]:
+    if not symbols:
+        return []
+    if histories is None:
+        histories = download_histories(symbols, report_date)
+
+    def fetch(symbol: str) -> Optional[TickerSnapshot]:
         try:
-            snapshot = get_price_snapshot(symbol, report_date)
+            history = histories.get(symbol)
+            if history is None:
+                snapshot = get_price_snapshot(symbol, report_date, include_events)
+            else:
+                snapshot = snapshot_from_frame(symbol, history, report_date, include_events=include_events)
         except Exception as exc:
             print(f"Failed to fetch {symbol}: {exc}")
-            continue
+            return None
         print(f"Fetched {symbol} price={snapshot.price:.2f}")
-        snapshots.append(snapshot)
-    return snapshots
+        return snapshot
+
+    with ThreadPoolExecutor(max_workers=_get_worker_count(len(symbols))) as executor:
+        results = list(executor.map(fetch, symbols))
+    return [snapshot for snapshot in results if snapshot]
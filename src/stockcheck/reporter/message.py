@@ -3,19 +3,27 @@ from typing import Dict, List
 from .models import InstitutionalSnapshot, TickerSnapshot
 
 
+_SNAPSHOT_FORMAT = "{0} {1:.2f} ({2:+.2f}, {3:+.2f}%) MA50 {4:.2f} MA200 {5:.2f} Earnings {6}".format
+_NET_FORMAT = "{0} {1:+,.0f}".format
+_INSTITUTIONAL_FORMAT = "{0} {1} Net {2:+,.0f}{3}".format
+
+
 def format_snapshot(snapshot: TickerSnapshot) -> str:
-    return (
-        f"{snapshot.symbol} {snapshot.price:.2f} "
-        f"({snapshot.change:+.2f}, {snapshot.change_pct:+.2f}%) "
-        f"MA50 {snapshot.ma50:.2f} MA200 {snapshot.ma200:.2f} "
-        f"Earnings {snapshot.earnings_date or 'N/A'}"
+    return _SNAPSHOT_FORMAT(
+        snapshot.symbol,
+        snapshot.price,
+        snapshot.change,
+        snapshot.change_pct,
+        snapshot.ma50,
+        snapshot.ma200,
+        snapshot.earnings_date or "N/A",
     )
 
 
 def format_institutional(item: InstitutionalSnapshot) -> str:
-    details = ", ".join(f"{name} {value:+,.0f}" for name, value in item.net_by_name.items())
+    details = ", ".join(_NET_FORMAT(name, value) for name, value in item.net_by_name.items())
     detail_text = f" ({details})" if details else ""
-    return f"{item.symbol} {item.date} Net {item.total_net:+,.0f}{detail_text}"
+    return _INSTITUTIONAL_FORMAT(item.symbol, item.date, item.total_net, detail_text)
 
 
 def build_message(
@@ -32,15 +40,15 @@ def build_message(
     if earnings_reminder:
         lines.append(f"Earnings Today: {earnings_reminder}")
     lines.extend(["", "Watchlist:"])
-    lines.extend(format_snapshot(s) for s in snapshots)
+    lines.extend(map(format_snapshot, snapshots))
     lines.append("")
     lines.append("Indices:")
-    lines.extend(format_snapshot(s) for s in indices)
+    lines.extend(map(format_snapshot, indices))
 
     if institutional:
         lines.append("")
         lines.append("Institutional (FinMind):")
-        lines.extend(format_institutional(item) for item in institutional)
+        lines.extend(map(format_institutional, institutional))
 
     lines.append("")
     lines.append("AI Summary:")
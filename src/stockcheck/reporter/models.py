@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Dict, List
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TickerSnapshot:
     symbol: str
     price: float
@@ -17,7 +17,7 @@ class TickerSnapshot:
     news: List[Dict[str, str]]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class InstitutionalSnapshot:
     symbol: str
     date: str
@@ -1,20 +1,27 @@
-import json
+import functools
 import os
-import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Dict, List
 from zoneinfo import ZoneInfo
 
-from dotenv import load_dotenv
+from stockcheck.pipeline.utils import load_env, loads_json
 
 from . import ai, institutional, market_data, message, storage
+from .line_messaging import send_line_message
+
+
+@functools.lru_cache(maxsize=8)
+def _load_subscriptions_cached(path: str, mtime_ns: int) -> Dict[str, List[str]]:
+    with open(path, "rb") as handle:
+        return loads_json(handle.read().removeprefix(b"\xef\xbb\xbf"))
 
 
 def load_subscriptions(path: str) -> Dict[str, List[str]]:
-    with open(path, "r", encoding="utf-8") as handle:
-        return json.load(handle)
+    return _load_subscriptions_cached(path, os.stat(path).st_mtime_ns)
 
 
+@functools.lru_cache(maxsize=None)
 def get_market_timezone(market: str) -> ZoneInfo:
     if market == "tw":
         return ZoneInfo("Asia/Taipei")
@@ -22,7 +29,7 @@ def get_market_timezone(market: str) -> ZoneInfo:
 
 
 def run(market: str, subscription_path: str) -> None:
-    load_dotenv()
+    load_env()
     subscriptions = load_subscriptions(subscription_path)
     watchlist = subscriptions.get(market, [])
     if not watchlist:
@@ -39,27 +46,63 @@ def run(market: str, subscription_path: str) -> None:
     else:
         index_symbols = ["^GSPC", "^IXIC", "^DJI"]
 
-    snapshots = market_data.collect_market_data(watchlist, report_date)
-    indices = market_data.collect_market_data(index_symbols, report_date)
-    print(f"Fetched snapshots={len(snapshots)} indices={len(indices)}")
-    if not snapshots:
-        raise RuntimeError("No snapshots collected; aborting report run.")
-
     finmind_token = os.getenv("FINMIND_API_KEY", "")
-    institutional_data = (
-        institutional.collect_finmind_data(watchlist, report_date, finmind_token)
-        if market == "tw"
-        else []
-    )
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        context_future = executor.submit(storage.load_pipeline_context, market, watchlist)
+        institutional_future = (
+            executor.submit(institutional.collect_finmind_data, watchlist, report_date, finmind_token)
+            if market == "tw"
+            else None
+        )
+        histories = market_data.download_histories(watchlist + index_symbols, report_date)
+        indices_future = executor.submit(
+            market_data.collect_market_data, index_symbols, report_date, histories, include_events=False
+        )
+        snapshots = market_data.collect_market_data(watchlist, report_date, histories)
+        indices = indices_future.result()
+        print(f"Fetched snapshots={len(snapshots)} indices={len(indices)}")
+        if not snapshots:
+            raise RuntimeError("No snapshots collected; aborting report run.")
+        institutional_data = institutional_future.result() if institutional_future else []
+        pipeline_context = context_future.result()
+    symbols = [s.symbol for s in snapshots]
     if market == "tw":
         print(f"FinMind enabled={bool(finmind_token)} items={len(institutional_data)}")
 
-    pipeline_context = storage.load_pipeline_context(market, watchlist)
+    db_path = storage.get_db_path()
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    setup_conn = storage.connect(db_path)
+    try:
+        storage.init_db(setup_conn)
+    finally:
+        setup_conn.close()
+
+    def load_targets() -> Dict[str, Any]:
+        targets_conn = storage.connect(db_path)
+        try:
+            return storage.load_comparison_targets(
+                targets_conn, market, report_date, symbols
+            )
+        finally:
+            targets_conn.close()
+
+    db_executor = ThreadPoolExecutor(max_workers=1)
+    targets_future = db_executor.submit(load_targets)
+    db_executor.shutdown(wait=False)
+
     if pipeline_context:
         print(f"Pipeline context loaded symbols={len(pipeline_context)}")
 
     print("Calling Gemini...")
     allow_retry = True
+    data_blob = ai.build_data_blob(
+        market,
+        snapshots,
+        indices,
+        institutional_data,
+        pipeline_context,
+        now.isoformat(),
+    )
     prompt = ai.build_prompt(
         market,
         snapshots,
@@ -67,6 +110,7 @@ def run(market: str, subscription_path: str) -> None:
         institutional_data,
         pipeline_context,
         now.isoformat(),
+        data_blob=data_blob,
     )
     try:
         ai_raw = ai.call_gemini(prompt)
@@ -74,7 +118,7 @@ def run(market: str, subscription_path: str) -> None:
         print(f"Gemini request raised an exception: {exc}")
         ai_raw = "GEMINI_FAILED"
     print(f"Gemini response length={len(ai_raw)}")
-    parsed = ai.parse_ai_response(ai_raw, [s.symbol for s in snapshots])
+    parsed = ai.parse_ai_response(ai_raw, symbols)
     ai_summary = parsed["summary"]
 
     if "GEMINI_QUOTA_EXCEEDED" in ai_summary or "GEMINI_FAILED" in ai_summary:
@@ -93,10 +137,10 @@ def run(market: str, subscription_path: str) -> None:
                 institutional_data,
                 pipeline_context,
             )
-            parsed = {"predictions": {s.symbol: "unknown" for s in snapshots}, "valid_json": False}
+            parsed = {"predictions": dict.fromkeys(symbols, "unknown"), "valid_json": False}
             allow_retry = False
         else:
-            parsed = ai.parse_ai_response(ai_raw, [s.symbol for s in snapshots])
+            parsed = ai.parse_ai_response(ai_raw, symbols)
             ai_summary = parsed["summary"]
     elif "skipped AI summary" in ai_summary:
         ai_summary = ai.build_fallback_summary(
@@ -106,38 +150,17 @@ def run(market: str, subscription_path: str) -> None:
             institutional_data,
             pipeline_context,
         )
-        parsed = {"predictions": {s.symbol: "unknown" for s in snapshots}, "valid_json": False}
+        parsed = {"predictions": dict.fromkeys(symbols, "unknown"), "valid_json": False}
         allow_retry = False
 
-    if allow_retry and (not parsed.get("valid_json") or len(ai_summary) < 400):
+    if allow_retry and (not parsed.get("valid_json") or not ai.is_acceptable_summary(ai_summary)):
         print("Gemini summary invalid/short; retrying with stricter instruction.")
-        retry_prompt = (
-            "請用中文輸出 JSON，且只輸出 JSON。summary 需 400-600 字，"
-            "分成三段：大盤、重要個股、風險。predictions 必須回傳 up/down/neutral。資料如下："
-            + json.dumps(
-                {
-                    "market": market,
-                    "watchlist": [ai.snapshot_to_dict(s) for s in snapshots],
-                    "indices": [ai.snapshot_to_dict(s) for s in indices],
-                    "institutional": [
-                        {
-                            "symbol": item.symbol,
-                            "date": item.date,
-                            "total_net": item.total_net,
-                            "net_by_name": item.net_by_name,
-                        }
-                        for item in institutional_data
-                    ],
-                    "pipeline": pipeline_context,
-                },
-                ensure_ascii=False,
-            )
-        )
+        retry_prompt = ai.build_retry_prompt(data_blob)
         ai_raw = ai.call_gemini(retry_prompt)
-        parsed = ai.parse_ai_response(ai_raw, [s.symbol for s in snapshots])
+        parsed = ai.parse_ai_response(ai_raw, symbols)
         ai_summary = parsed["summary"]
 
-    if len(ai_summary) < 400:
+    if not ai.is_acceptable_summary(ai_summary):
         print("Gemini summary still short; using fallback summary.")
         ai_summary = ai.build_fallback_summary(
             market,
@@ -147,23 +170,28 @@ def run(market: str, subscription_path: str) -> None:
             pipeline_context,
         )
 
-    predictions = parsed.get("predictions", {s.symbol: "unknown" for s in snapshots})
+    predictions = parsed.get("predictions", dict.fromkeys(symbols, "unknown"))
 
     earnings_today = [s.symbol for s in snapshots if s.earnings_today]
     earnings_reminder = ", ".join(earnings_today)
 
-    db_path = storage.get_db_path()
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    conn = storage.connect(db_path)
     try:
-        storage.init_db(conn)
-        print(f"DB save reports={len(snapshots)} path={db_path}")
-        storage.save_reports(conn, market, report_date_str, snapshots, ai_summary, predictions)
-        accuracy_notes = storage.compare_predictions(conn, market, report_date, snapshots, predictions)
+        accuracy_notes = storage.compare_predictions(
+            conn, market, report_date, snapshots, predictions, targets_future.result()
+        )
         print(f"Accuracy checks={len(accuracy_notes)}")
     finally:
         conn.close()
 
+    def persist_reports() -> None:
+        save_conn = storage.connect(db_path)
+        try:
+            print(f"DB save reports={len(snapshots)} path={db_path}")
+            storage.save_reports(save_conn, market, report_date_str, snapshots, ai_summary, predictions)
+        finally:
+            save_conn.close()
+
     final_message = message.build_message(
         market,
         snapshots,
@@ -178,6 +206,14 @@ def run(market: str, subscription_path: str) -> None:
     print(f"AI summary length={len(ai_summary)}")
     print(f"LINE message length={len(final_message)}")
     print(final_message)
-    from .line_messaging import send_line_message
-
-    send_line_message(final_message)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        save_future = executor.submit(persist_reports)
+        line_error = None
+        try:
+            send_line_message(final_message)
+        except Exception as exc:
+            line_error = exc
+            print(f"LINE push failed: {exc}")
+        save_future.result()
+    if line_error is not None:
+        raise line_error
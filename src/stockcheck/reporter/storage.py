@@ -1,10 +1,12 @@
 import os
 import sqlite3
+from collections import defaultdict
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from stockcheck.pipeline import db as pipeline_db
+from stockcheck.pipeline.utils import dumps_json, utc_now_iso
 
 from .models import TickerSnapshot
 
@@ -17,120 +19,133 @@ def get_db_path() -> str:
     return str(root / "data" / "reports.db")
 
 
+_INDICATOR_COLUMNS = (
+    "date",
+    "sma20",
+    "sma50",
+    "ema12",
+    "ema26",
+    "rsi14",
+    "macd",
+    "macd_signal",
+    "macd_hist",
+    "bb_mid",
+    "bb_upper",
+    "bb_lower",
+)
+
+
 def load_pipeline_context(market: str, symbols: List[str]) -> Dict[str, Any]:
     db_path = pipeline_db.get_pipeline_db_path()
     if not os.path.exists(db_path):
         return {}
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
 
-    context: Dict[str, Any] = {}
+    params = (market, dumps_json(symbols))
+    indicator_columns = ", ".join(_INDICATOR_COLUMNS)
+    payloads: Dict[str, Dict[str, Any]] = defaultdict(dict)
     conn = sqlite3.connect(db_path)
     try:
-        for symbol in symbols:
-            indicators = conn.execute(
-                """
-                SELECT date, sma20, sma50, ema12, ema26, rsi14, macd, macd_signal, macd_hist,
-                       bb_mid, bb_upper, bb_lower
-                FROM indicators_daily
-                WHERE market = ? AND symbol = ?
-                ORDER BY date DESC
-                LIMIT 1
-                """,
-                (market, symbol),
-            ).fetchone()
-            news_rows = conn.execute(
-                """
-                SELECT title, url, published_at, source
+        indicator_rows = conn.execute(
+            f"""
+            SELECT symbol, {indicator_columns}
+            FROM indicators_daily
+            WHERE market = ? AND (symbol, date) IN (
+                  SELECT symbol, MAX(date)
+                  FROM indicators_daily
+                  WHERE market = ? AND symbol IN (SELECT value FROM json_each(?))
+                  GROUP BY symbol
+              )
+            """,
+            (market, *params),
+        ).fetchall()
+        news_rows = conn.execute(
+            """
+            WITH ranked AS (
+                SELECT symbol, title, url, published_at, source,
+                       ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY published_at DESC) AS rn
                 FROM news_items
-                WHERE market = ? AND symbol = ?
-                ORDER BY published_at DESC
-                LIMIT 3
-                """,
-                (market, symbol),
-            ).fetchall()
-            sentiment_rows = conn.execute(
-                """
-                SELECT title, url, published_at, source, score
+                WHERE market = ? AND symbol IN (SELECT value FROM json_each(?))
+            )
+            SELECT symbol, title, url, published_at, source
+            FROM ranked
+            WHERE rn <= 3
+            ORDER BY symbol, rn
+            """,
+            params,
+        ).fetchall()
+        sentiment_rows = conn.execute(
+            """
+            WITH ranked AS (
+                SELECT symbol, title, url, published_at, source, score,
+                       ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY published_at DESC) AS rn
                 FROM sentiment_items
-                WHERE market = ? AND symbol = ?
-                ORDER BY published_at DESC
-                LIMIT 3
-                """,
-                (market, symbol),
-            ).fetchall()
-            financial_rows = conn.execute(
-                """
-                SELECT report_type, source
-                FROM financials
-                WHERE market = ? AND symbol = ?
-                """,
-                (market, symbol),
-            ).fetchall()
-
-            payload: Dict[str, Any] = {}
-            if indicators:
-                (
-                    date_str,
-                    sma20,
-                    sma50,
-                    ema12,
-                    ema26,
-                    rsi14,
-                    macd,
-                    macd_signal,
-                    macd_hist,
-                    bb_mid,
-                    bb_upper,
-                    bb_lower,
-                ) = indicators
-                payload["indicators"] = {
-                    "date": date_str,
-                    "sma20": sma20,
-                    "sma50": sma50,
-                    "ema12": ema12,
-                    "ema26": ema26,
-                    "rsi14": rsi14,
-                    "macd": macd,
-                    "macd_signal": macd_signal,
-                    "macd_hist": macd_hist,
-                    "bb_mid": bb_mid,
-                    "bb_upper": bb_upper,
-                    "bb_lower": bb_lower,
-                }
-            if news_rows:
-                payload["news"] = [
-                    {
-                        "title": title,
-                        "url": url,
-                        "published_at": published_at,
-                        "source": source,
-                    }
-                    for title, url, published_at, source in news_rows
-                ]
-            if sentiment_rows:
-                payload["sentiment"] = [
-                    {
-                        "title": title,
-                        "url": url,
-                        "published_at": published_at,
-                        "source": source,
-                        "score": score,
-                    }
-                    for title, url, published_at, source, score in sentiment_rows
-                ]
-            if financial_rows:
-                payload["financials"] = [
-                    {"report_type": report_type, "source": source}
-                    for report_type, source in financial_rows
-                ]
-            if payload:
-                context[symbol] = payload
+                WHERE market = ? AND symbol IN (SELECT value FROM json_each(?))
+            )
+            SELECT symbol, title, url, published_at, source, score
+            FROM ranked
+            WHERE rn <= 3
+            ORDER BY symbol, rn
+            """,
+            params,
+        ).fetchall()
+        financial_rows = conn.execute(
+            """
+            SELECT symbol, report_type, source
+            FROM financials
+            WHERE market = ? AND symbol IN (SELECT value FROM json_each(?))
+            """,
+            params,
+        ).fetchall()
     finally:
         conn.close()
 
-    return context
+    for symbol, *values in indicator_rows:
+        payloads[symbol]["indicators"] = dict(zip(_INDICATOR_COLUMNS, values))
+    for symbol, title, url, published_at, source in news_rows:
+        payloads[symbol].setdefault("news", []).append(
+            {
+                "title": title,
+                "url": url,
+                "published_at": published_at,
+                "source": source,
+            }
+        )
+    for symbol, title, url, published_at, source, score in sentiment_rows:
+        payloads[symbol].setdefault("sentiment", []).append(
+            {
+                "title": title,
+                "url": url,
+                "published_at": published_at,
+                "source": source,
+                "score": score,
+            }
+        )
+    for symbol, report_type, source in financial_rows:
+        payloads[symbol].setdefault("financials", []).append({"report_type": report_type, "source": source})
+
+    return {symbol: payloads[symbol] for symbol in symbols if payloads.get(symbol)}
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA mmap_size=268435456")
+    except sqlite3.OperationalError:
+        pass
+    return conn
 
 
 def init_db(conn: sqlite3.Connection) -> None:
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.OperationalError:
+        pass
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS reports (
@@ -145,6 +160,9 @@ def init_db(conn: sqlite3.Connection) -> None:
         )
         """
     )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_reports_lookup ON reports (market, symbol, report_date DESC)"
+    )
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS accuracy (
@@ -165,6 +183,19 @@ def init_db(conn: sqlite3.Connection) -> None:
     conn.commit()
 
 
+_INSERT_REPORT_SQL = """
+INSERT OR REPLACE INTO reports (market, symbol, report_date, price, ai_summary, ai_prediction, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_INSERT_ACCURACY_SQL = """
+INSERT OR REPLACE INTO accuracy (
+    market, symbol, report_date, report_price, compare_date, compare_price,
+    ai_prediction, actual_direction, hit, created_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
 def save_reports(
     conn: sqlite3.Connection,
     market: str,
@@ -173,24 +204,49 @@ def save_reports(
     ai_summary: str,
     predictions: Dict[str, str],
 ) -> None:
-    created_at = datetime.utcnow().isoformat() + "Z"
-    for snapshot in snapshots:
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO reports (market, symbol, report_date, price, ai_summary, ai_prediction, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                market,
-                snapshot.symbol,
-                report_date,
-                snapshot.price,
-                ai_summary,
-                predictions.get(snapshot.symbol, "unknown"),
-                created_at,
-            ),
+    created_at = utc_now_iso()
+    rows = [
+        (
+            market,
+            snapshot.symbol,
+            report_date,
+            snapshot.price,
+            ai_summary,
+            predictions.get(snapshot.symbol, "unknown"),
+            created_at,
         )
-    conn.commit()
+        for snapshot in snapshots
+    ]
+    with conn:
+        conn.executemany(_INSERT_REPORT_SQL, rows)
+
+
+def load_comparison_targets(
+    conn: sqlite3.Connection,
+    market: str,
+    report_date: datetime.date,
+    symbols: List[str],
+) -> Dict[str, Any]:
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    rows = conn.execute(
+        """
+        WITH ranked AS (
+            SELECT symbol, report_date, price, ai_prediction,
+                   ROW_NUMBER() OVER by_date AS rn,
+                   COUNT(*) OVER (by_date ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING) AS total
+            FROM reports
+            WHERE market = ? AND report_date < ? AND symbol IN (SELECT value FROM json_each(?))
+            WINDOW by_date AS (PARTITION BY symbol ORDER BY report_date DESC)
+        )
+        SELECT symbol, report_date, price, ai_prediction
+        FROM ranked
+        WHERE rn = CASE WHEN total >= 7 THEN 7 ELSE 1 END
+        """,
+        (market, report_date.isoformat(), dumps_json(symbols)),
+    ).fetchall()
+    return {row[0]: row[1:] for row in rows}
 
 
 def compare_predictions(
@@ -199,40 +255,24 @@ def compare_predictions(
     report_date: datetime.date,
     snapshots: List[TickerSnapshot],
     predictions: Dict[str, str],
+    targets: Optional[Dict[str, Any]] = None,
 ) -> List[str]:
     compare_date = report_date.isoformat()
+    created_at = utc_now_iso()
     notes = []
+    accuracy_rows = []
 
-    for snapshot in snapshots:
-        report_dates = conn.execute(
-            """
-            SELECT report_date
-            FROM reports
-            WHERE market = ? AND symbol = ? AND report_date < ?
-            ORDER BY report_date DESC
-            LIMIT 7
-            """,
-            (market, snapshot.symbol, compare_date),
-        ).fetchall()
-        if not report_dates:
-            continue
-        if len(report_dates) >= 7:
-            target_date = report_dates[-1][0]
-        else:
-            target_date = report_dates[0][0]
+    if targets is None:
+        targets = load_comparison_targets(conn, market, report_date, [s.symbol for s in snapshots])
+    if not targets:
+        return notes
 
-        cursor = conn.execute(
-            """
-            SELECT price, ai_prediction FROM reports
-            WHERE market = ? AND symbol = ? AND report_date = ?
-            """,
-            (market, snapshot.symbol, target_date),
-        )
-        row = cursor.fetchone()
-        if not row:
+    for snapshot in snapshots:
+        target = targets.get(snapshot.symbol)
+        if target is None:
             continue
+        target_date, report_price, ai_prediction = target
 
-        report_price, ai_prediction = row
         if ai_prediction == "unknown":
             continue
         ai_prediction = ai_prediction or predictions.get(snapshot.symbol, "unknown")
@@ -244,13 +284,7 @@ def compare_predictions(
             actual_direction = "neutral"
 
         hit = int(ai_prediction == actual_direction)
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO accuracy (
-                market, symbol, report_date, report_price, compare_date, compare_price,
-                ai_prediction, actual_direction, hit, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+        accuracy_rows.append(
             (
                 market,
                 snapshot.symbol,
@@ -261,13 +295,15 @@ def compare_predictions(
                 ai_prediction,
                 actual_direction,
                 hit,
-                datetime.utcnow().isoformat() + "Z",
-            ),
+                created_at,
+            )
         )
         status = "HIT" if hit else "MISS"
         notes.append(
             f"{snapshot.symbol}: predicted {ai_prediction}, actual {actual_direction} ({status})"
         )
 
-    conn.commit()
+    if accuracy_rows:
+        with conn:
+            conn.executemany(_INSERT_ACCURACY_SQL, accuracy_rows)
     return notes
@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from stockcheck.pipeline.indicators import compute_indicators_tuples
+from stockcheck.pipeline.models import PriceRow
+
+
+def _price_rows(count: int = 80) -> list:
+    rng = np.random.default_rng(7)
+    closes = 100 + np.cumsum(rng.normal(0, 1.5, count))
+    dates = pd.bdate_range("2024-01-02", periods=count).strftime("%Y-%m-%d")
+    return [
+        PriceRow(
+            date=day,
+            open=float(close),
+            high=float(close) + 1,
+            low=float(close) - 1,
+            close=float(close),
+            volume=1000.0,
+            source="test",
+        )
+        for day, close in zip(dates, closes)
+    ]
+
+
+def _pandas_reference(rows: list) -> pd.DataFrame:
+    close = pd.Series([row.close for row in rows])
+    ema12 = close.ewm(span=12, adjust=False, min_periods=12).mean()
+    ema26 = close.ewm(span=26, adjust=False, min_periods=26).mean()
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0.0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    avg_loss = (-delta).clip(lower=0.0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    macd = ema12 - ema26
+    macd_signal = macd.ewm(span=9, adjust=False, min_periods=9).mean()
+    bb_mid = close.rolling(window=20, min_periods=20).mean()
+    bb_std = close.rolling(window=20, min_periods=20).std()
+    return pd.DataFrame(
+        {
+            "sma20": bb_mid,
+            "sma50": close.rolling(window=50, min_periods=50).mean(),
+            "ema12": ema12,
+            "ema26": ema26,
+            "rsi14": 100 - (100 / (1 + avg_gain / avg_loss)),
+            "macd": macd,
+            "macd_signal": macd_signal,
+            "macd_hist": macd - macd_signal,
+            "bb_mid": bb_mid,
+            "bb_upper": bb_mid + 2.0 * bb_std,
+            "bb_lower": bb_mid - 2.0 * bb_std,
+        }
+    )
+
+
+def test_compute_indicators_tuples_matches_pandas() -> None:
+    rows = _price_rows()
+    result = compute_indicators_tuples(rows)
+    expected = _pandas_reference(rows)
+
+    assert [item[0] for item in result] == [row.date for row in rows]
+    for column_idx, column in enumerate(expected.columns, start=1):
+        for row_idx, want in enumerate(expected[column].tolist()):
+            got = result[row_idx][column_idx]
+            if math.isnan(want):
+                assert got is None, (column, row_idx, got)
+            else:
+                assert got is not None, (column, row_idx)
+                assert math.isclose(got, want, rel_tol=1e-9, abs_tol=1e-9), (column, row_idx, got, want)
+
+
+def test_compute_indicators_tuples_warm_up_rows() -> None:
+    result = compute_indicators_tuples(_price_rows())
+    first_valid = {
+        "sma20": 19,
+        "sma50": 49,
+        "ema12": 11,
+        "ema26": 25,
+        "rsi14": 14,
+        "macd": 25,
+        "macd_signal": 33,
+        "bb_upper": 19,
+    }
+    columns = ("sma20", "sma50", "ema12", "ema26", "rsi14", "macd", "macd_signal", "macd_hist", "bb_mid", "bb_upper")
+    for column, start in first_valid.items():
+        column_idx = columns.index(column) + 1
+        assert result[start - 1][column_idx] is None, column
+        assert result[start][column_idx] is not None, column
+
+
+def test_compute_indicators_tuples_empty() -> None:
+    assert compute_indicators_tuples([]) == []
@@ -0,0 +1,92 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+from yfinance.exceptions import YFPricesMissingError, YFTzMissingError
+
+from stockcheck.pipeline import cache as pipeline_cache
+from stockcheck.reporter import market_data
+
+
+class _FakeTicker:
+    def __init__(self, calendar) -> None:
+        self._calendar = calendar
+        self.calendar_calls = 0
+
+    @property
+    def calendar(self):
+        self.calendar_calls += 1
+        return self._calendar
+
+
+@pytest.fixture
+def file_cache(tmp_path, monkeypatch):
+    cache = pipeline_cache.FileCache(str(tmp_path), ttl_sec=3600)
+    monkeypatch.setattr(pipeline_cache, "_CACHE", cache)
+    monkeypatch.setenv("INCLUDE_NEWS", "false")
+    return cache
+
+
+def test_fetch_events_reads_dict_calendar(file_cache) -> None:
+    ticker = _FakeTicker({"Earnings Date": [date(2024, 4, 30), date(2024, 5, 2)], "Earnings Average": 1.5})
+
+    earnings_date, news = market_data.fetch_events("AAPL", ticker, date(2024, 4, 1))
+
+    assert earnings_date == "2024-04-30"
+    assert news == []
+    assert file_cache.get("AAPL", "calendar_latest", ttl_sec=-1) == "2024-04-30"
+
+
+def test_fetch_events_skips_past_earnings(file_cache) -> None:
+    ticker = _FakeTicker({"Earnings Date": [date(2024, 1, 25)]})
+
+    earnings_date, _ = market_data.fetch_events("AAPL", ticker, date(2024, 4, 1))
+
+    assert earnings_date == ""
+    assert file_cache.get("AAPL", "calendar_latest", ttl_sec=-1) is None
+
+
+def test_fetch_events_handles_empty_calendar(file_cache) -> None:
+    earnings_date, _ = market_data.fetch_events("AAPL", _FakeTicker({}), date(2024, 4, 1))
+
+    assert earnings_date == ""
+
+
+def test_fetch_events_caches_calendar_per_day(file_cache) -> None:
+    ticker = _FakeTicker({"Earnings Date": [date(2024, 4, 10)]})
+
+    first, _ = market_data.fetch_events("MSFT", ticker, date(2024, 4, 1))
+    second, _ = market_data.fetch_events("MSFT", ticker, date(2024, 4, 1))
+
+    assert first == second == "2024-04-10"
+    assert ticker.calendar_calls == 1
+    assert file_cache.get("MSFT", "calendar_2024-04-01") == "2024-04-10"
+
+
+class _FlakyHistoryTicker:
+    def __init__(self, errors) -> None:
+        self.errors = list(errors)
+        self.calls = 0
+
+    def history(self, period, raise_errors=False):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return pd.DataFrame({"Close": [1.0]})
+
+
+def test_fetch_history_retries_missing_prices() -> None:
+    ticker = _FlakyHistoryTicker([YFPricesMissingError("AAPL", "")])
+
+    history = market_data.fetch_history(ticker, "1y", retries=3, delay_sec=0)
+
+    assert not history.empty
+    assert ticker.calls == 2
+
+
+def test_fetch_history_fails_fast_on_missing_ticker() -> None:
+    ticker = _FlakyHistoryTicker([YFTzMissingError("NOPE")])
+
+    with pytest.raises(YFTzMissingError):
+        market_data.fetch_history(ticker, "1y", retries=3, delay_sec=0)
+    assert ticker.calls == 1